@@ -0,0 +1,101 @@
+"""
+Benchmark for face verification throughput and latency.
+
+Runs entirely offline against FakeFaceComparer, which sleeps like a
+network-bound Rekognition call. Compares one-at-a-time verification with
+FaceVerificationService.verify_many at several pool sizes, and times what
+creating a fresh boto3 client per call (the previous behaviour) costs
+compared to reusing the shared one.
+
+Run from the repository root:
+
+    python benchmarks/bench_face_verification.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from botocore.config import Config
+from models.live_face import FaceVerificationService, FakeFaceComparer, REKOGNITION_CONFIG, verify_facial_identity
+
+
+class TimedComparer:
+    """Wraps a comparer and records how long every compare() call took."""
+    def __init__(self, comparer):
+        self.comparer = comparer
+        self.latencies = []
+
+    def compare(self, source_image_bytes, target_image_bytes, similarity_threshold):
+        start = time.perf_counter()
+        try:
+            return self.comparer.compare(source_image_bytes, target_image_bytes, similarity_threshold)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def make_pairs(n_pairs: int, seed: int = 0):
+    """Half matching and half non-matching pairs of fake image bytes."""
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for i in range(n_pairs):
+        source = rng.bytes(64)
+        pairs.append((source, source if i % 2 == 0 else rng.bytes(64)))
+    return pairs
+
+
+def report(name: str, elapsed: float, n_pairs: int, latencies=None):
+    line = f"{name:<28} {n_pairs / elapsed:>10.1f} pairs/s"
+    if latencies:
+        p50, p95 = np.percentile(np.array(latencies) * 1000, [50, 95])
+        line += f"   call p50 {p50:7.1f} ms   p95 {p95:7.1f} ms"
+    print(line)
+
+
+def bench_client_creation(n_calls: int):
+    """Per-call cost of building a new Rekognition client versus reusing one."""
+    kwargs = dict(aws_access_key_id='benchmark', aws_secret_access_key='benchmark',
+                  region_name='us-east-1', config=Config(**REKOGNITION_CONFIG))
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        boto3.client('rekognition', **kwargs)
+    fresh_ms = (time.perf_counter() - start) / n_calls * 1000
+    print(f"\nCreating a new boto3 client per call: {fresh_ms:.2f} ms (reused client: ~0 ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, default=64, help='Number of image pairs verified per run.')
+    parser.add_argument('--latency', type=float, default=0.2, help='Fake comparer base latency in seconds.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16], help='Pool sizes to try.')
+    parser.add_argument('--client-calls', type=int, default=20, help='boto3 clients created for the client timing.')
+    args = parser.parse_args()
+
+    pairs = make_pairs(args.pairs)
+    print(f"{args.pairs} pairs, fake comparer latency {args.latency * 1000:.0f} ms\n")
+
+    comparer = TimedComparer(FakeFaceComparer(latency=args.latency))
+    start = time.perf_counter()
+    sequential = [verify_facial_identity(source, target, comparer=comparer) for source, target in pairs]
+    report('sequential', time.perf_counter() - start, args.pairs, comparer.latencies)
+
+    for workers in args.workers:
+        comparer = TimedComparer(FakeFaceComparer(latency=args.latency))
+        with FaceVerificationService(comparer=comparer, max_workers=workers, timeout=args.latency * 10) as service:
+            start = time.perf_counter()
+            results = service.verify_many(pairs)
+            elapsed = time.perf_counter() - start
+        if results != sequential:
+            raise AssertionError(f"verify_many with {workers} workers disagrees with sequential verification")
+        report(f'verify_many, {workers} workers', elapsed, args.pairs, comparer.latencies)
+
+    bench_client_creation(args.client_calls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for the image preprocessing stage of face verification.
+
+Builds synthetic phone-sized photos (rotated via EXIF, like a portrait
+shot) and verifies them against one ID-card image, first sending the raw
+upload bytes as before and then through ImagePreprocessor. Reports the
+bytes sent per verification, the preprocessing time and the end-to-end
+latency against FakeFaceComparer with a simulated upload bandwidth.
+
+Run from the repository root:
+
+    python benchmarks/bench_image_preprocessing.py
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.live_face import EXIF_ORIENTATION, FakeFaceComparer, ImagePreprocessor, verify_facial_identity
+from models import live_face
+
+
+def make_photo(width: int, height: int, seed: int, orientation: int = 6) -> bytes:
+    """A camera-like JPEG: smooth gradients plus sensor noise, with an EXIF orientation."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, size=base.shape), 0, 255).astype(np.uint8)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format='JPEG', quality=95, exif=exif.tobytes())
+    return output.getvalue()
+
+
+def run(pairs, preprocess: bool, bandwidth: float, latency: float):
+    """Verifies every pair in turn; returns (bytes sent, per-verification latencies)."""
+    comparer = FakeFaceComparer(latency=latency, jitter=0, bytes_per_second=bandwidth)
+    sent = 0
+    latencies = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        if preprocess:
+            source = live_face.default_preprocessor.prepare(source)
+            target = live_face.default_preprocessor.prepare(target)
+        verify_facial_identity(source, target, comparer=comparer, preprocess=False)
+        latencies.append(time.perf_counter() - start)
+        sent += len(source) + len(target)
+    return sent, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attempts', type=int, default=8, help='Verification attempts (one ID card, new selfies).')
+    parser.add_argument('--size', type=int, nargs=2, default=[4032, 3024], help='Width and height of the photos.')
+    parser.add_argument('--max-edge', type=int, default=1280, help='ImagePreprocessor max_edge.')
+    parser.add_argument('--quality', type=int, default=90, help='ImagePreprocessor JPEG quality.')
+    parser.add_argument('--bandwidth', type=float, default=2.5e6, help='Simulated upload bytes per second.')
+    parser.add_argument('--latency', type=float, default=0.15, help='Simulated API latency in seconds.')
+    args = parser.parse_args()
+
+    width, height = args.size
+    id_card = make_photo(width, height, seed=0)
+    selfies = [make_photo(width, height, seed=i + 1) for i in range(args.attempts)]
+    pairs = [(id_card, selfie) for selfie in selfies]
+    print(f"{args.attempts} attempts, {width}x{height} photos, "
+          f"{len(id_card) / 1e6:.2f} MB per upload, {args.bandwidth / 1e6:.1f} MB/s upload\n")
+
+    preprocessor = ImagePreprocessor(max_edge=args.max_edge, quality=args.quality)
+    start = time.perf_counter()
+    prepared = preprocessor.prepare(selfies[0])
+    cold_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    preprocessor.prepare(selfies[0])
+    cached_ms = (time.perf_counter() - start) * 1000
+    print(f"Preprocessing one photo: {cold_ms:.1f} ms ({cached_ms:.2f} ms when cached), "
+          f"{Image.open(io.BytesIO(prepared)).size} {len(prepared) / 1e3:.0f} kB")
+
+    live_face.default_preprocessor = preprocessor
+    for name, preprocess in [('raw upload bytes', False), ('preprocessed', True)]:
+        sent, latencies = run(pairs, preprocess, args.bandwidth, args.latency)
+        p50, p95 = np.percentile(latencies * 1000, [50, 95])
+        print(f"{name:<18} {sent / len(pairs) / 1e6:8.2f} MB sent per verification"
+              f"   latency p50 {p50:7.1f} ms   p95 {p95:7.1f} ms")
+    print(f"ID card cache: {preprocessor.cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
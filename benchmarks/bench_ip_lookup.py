@@ -0,0 +1,89 @@
+"""
+Benchmark for IPIntelligence.lookup_ip.
+
+Builds synthetic ASN and country range files (with ranges that only exist
+in one file, so the outer merge leaves overlapping and unmatched rows),
+times a cold load from CSV against a start from the binary cache, then
+compares lookups per second of the original full-table boolean scan
+against the interval index, and checks that both give the same answers.
+
+Run from the repository root:
+
+    python benchmarks/bench_ip_lookup.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from ipaddress import ip_address
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.fingerprint_model import IPIntelligence
+from synthetic import random_ips, write_range_files
+
+
+def legacy_lookup_ip(ip_db: pd.DataFrame, ip_str: str) -> dict:
+    """The original full-table scan, kept here as the baseline."""
+    try:
+        ip_int = int(ip_address(ip_str))
+        result = ip_db[(ip_db['ip_start_int'] <= ip_int) & (ip_db['ip_end_int'] >= ip_int)]
+        if not result.empty:
+            row = result.iloc[0]
+            org = str(row['organization']).lower()
+            country = str(row['country_code'])
+            if any(kw in org for kw in ['cloud', 'hosting', 'datacenter', 'cdn', 'google', 'amazon', 'cloudflare']):
+                ip_type = 'Data Center'
+            elif any(kw in org for kw in ['vpn', 'proxy']):
+                ip_type = 'VPN/Proxy'
+            else:
+                ip_type = 'Residential/Mobile'
+            return {'organization': org, 'ip_type': ip_type, 'country': country}
+    except ValueError:
+        pass
+    return {'organization': 'Unknown', 'ip_type': 'Unknown', 'country': 'Unknown'}
+
+
+def lookups_per_second(lookup, ips):
+    start = time.perf_counter()
+    results = [lookup(ip) for ip in ips]
+    return len(ips) / (time.perf_counter() - start), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ranges', type=int, default=200_000, help='Number of ASN ranges to generate.')
+    parser.add_argument('--lookups', type=int, default=20_000, help='Number of lookups for the indexed path.')
+    parser.add_argument('--legacy-lookups', type=int, default=200, help='Number of lookups for the scan baseline.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asn_path, country_path = write_range_files(args.ranges, directory)
+        start = time.perf_counter()
+        db = IPIntelligence(asn_path, country_path)
+        cold_time = time.perf_counter() - start
+        # A second start hits the memory-mapped binary cache written by the first
+        start = time.perf_counter()
+        db = IPIntelligence(asn_path, country_path)
+        warm_time = time.perf_counter() - start
+        print(f"Loaded {len(db.ip_db)} merged rows: {cold_time:.2f}s from CSV, {warm_time * 1000:.1f}ms from cache")
+
+        # Looked up while the directory still exists, since the tables are
+        # memory-mapped from the cache inside it
+        ips = random_ips(args.lookups)
+        old_rate, old_results = lookups_per_second(lambda ip: legacy_lookup_ip(db.ip_db, ip),
+                                                   ips[:args.legacy_lookups])
+        new_rate, new_results = lookups_per_second(db.lookup_ip, ips)
+        # Unmaps the cache files, so the directory can be removed on Windows too
+        del db
+
+    print(f"full-table scan : {old_rate:>12,.0f} lookups/s")
+    print(f"interval index  : {new_rate:>12,.0f} lookups/s  ({new_rate / old_rate:,.0f}x)")
+    print(f"same answers    : {old_results == new_results[:len(old_results)]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Micro-benchmark for mouse feature extraction.
+
+Compares the vectorized `extract_mouse_features` against the original
+per-row `iloc` loop on synthetic sessions of 1k, 100k and 1M events, and
+checks that both produce the same feature row.
+
+Run from the repository root:
+
+    python benchmarks/bench_mouse_features.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.mouse_feature_extractor import calculate_distance, extract_mouse_features
+from synthetic import make_session
+
+
+def legacy_extract_mouse_features(session_df: pd.DataFrame) -> pd.DataFrame:
+    """The original loop-based implementation, kept here as the baseline."""
+    if session_df.empty:
+        return pd.DataFrame()
+
+    session_df = session_df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+    start_time = session_df['timestamp'].min()
+    end_time = session_df['timestamp'].max()
+    duration_seconds = (end_time - start_time) / 1000.0
+
+    clicks = session_df[session_df['event_type'] == 5]
+    moves = session_df[session_df['event_type'] == 2]
+
+    num_clicks = len(clicks)
+    num_moves = len(moves)
+
+    total_distance = 0
+    velocities = []
+
+    if len(moves) > 1:
+        for i in range(1, len(moves)):
+            prev = moves.iloc[i-1]
+            curr = moves.iloc[i]
+
+            dist = calculate_distance(prev['screen_x'], prev['screen_y'], curr['screen_x'], curr['screen_y'])
+            time_delta = (curr['timestamp'] - prev['timestamp']) / 1000.0
+
+            if time_delta > 0:
+                total_distance += dist
+                velocities.append(dist / time_delta)
+
+    avg_velocity = np.mean(velocities) if velocities else 0
+    std_velocity = np.std(velocities) if velocities else 0
+
+    if len(moves) > 1:
+        start_point = moves.iloc[0]
+        end_point = moves.iloc[-1]
+        direct_distance = calculate_distance(start_point['screen_x'], start_point['screen_y'], end_point['screen_x'], end_point['screen_y'])
+        straightness = direct_distance / total_distance if total_distance > 0 else 1.0
+    else:
+        straightness = 1.0
+
+    features = {
+        'duration_seconds': duration_seconds,
+        'num_clicks': num_clicks,
+        'num_moves': num_moves,
+        'total_distance': total_distance,
+        'avg_velocity_pixels_per_sec': avg_velocity,
+        'std_dev_velocity': std_velocity,
+        'straightness': straightness
+    }
+
+    return pd.DataFrame([features])
+
+
+def time_call(func, *args, repeat=3):
+    """Returns the best wall-clock time of `repeat` calls and the last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max', type=int, default=1_000_000,
+                        help='Skip the loop baseline for sessions larger than this (it is very slow).')
+    args = parser.parse_args()
+
+    print(f"{'events':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}  match")
+    for n_events in args.sizes:
+        session_df = make_session(n_events)
+        new_time, new_features = time_call(extract_mouse_features, session_df)
+
+        if n_events <= args.legacy_max:
+            old_time, old_features = time_call(legacy_extract_mouse_features, session_df, repeat=1)
+            match = old_features.equals(new_features)
+            print(f"{n_events:>10} {old_time:>12.4f} {new_time:>15.4f} {old_time / new_time:>8.0f}x  {match}")
+        else:
+            print(f"{n_events:>10} {'skipped':>12} {new_time:>15.4f} {'-':>9}  -")
+
+
+if __name__ == '__main__':
+    main()
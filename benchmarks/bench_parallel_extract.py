@@ -0,0 +1,73 @@
+"""
+Scaling benchmark for the process-pool training preprocessing.
+
+Times extract_mouse_features_bulk against ParallelExtractor.mouse_features
+on a synthetic raw mouse log, and parse_ips against its pooled fast path on
+random IPv4 strings, at each worker count. Every parallel result is checked
+to be identical to the single-core one. The pool is started before timing,
+so the numbers are the steady state of a training run.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel_extract.py
+    python benchmarks/bench_parallel_extract.py --users 100000 --jobs 1 4 16 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.fingerprint_model import parse_ips
+from models.mouse_feature_extractor import extract_mouse_features_bulk
+from models.parallel_extract import ParallelExtractor
+from synthetic import make_mouse_log, random_ips
+
+
+def time_call(func, *args, repeat=3, **kwargs):
+    """Returns the best wall-clock time of `repeat` calls and the last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20_000, help='Users in the synthetic mouse log.')
+    parser.add_argument('--events-per-user', type=int, default=200, help='Events per user.')
+    parser.add_argument('--ips', type=int, default=1_000_000, help='IP strings to convert.')
+    default_jobs = sorted({1, 2, 4, os.cpu_count() or 1})
+    parser.add_argument('--jobs', type=int, nargs='+', default=default_jobs, help='Worker counts to try.')
+    args = parser.parse_args()
+
+    raw_df = make_mouse_log(args.users, args.events_per_user)
+    ips = pd.Series(random_ips(args.ips))
+    print(f"{len(raw_df)} mouse events from {args.users} users, {args.ips} IP strings, {os.cpu_count()} cores\n")
+
+    mouse_serial, expected_features = time_call(extract_mouse_features_bulk, raw_df)
+    ip_serial, expected_ips = time_call(parse_ips, ips)
+    print(f"{'workers':>8} {'mouse (s)':>10} {'speedup':>8} {'ip parse (s)':>13} {'speedup':>8}  match")
+    print(f"{'serial':>8} {mouse_serial:>10.3f} {'1.0x':>8} {ip_serial:>13.3f} {'1.0x':>8}  -")
+
+    for n_jobs in args.jobs:
+        # min_rows=0 so that even one worker goes through the pool and shared memory
+        with ParallelExtractor(n_jobs=n_jobs, min_rows=0) as extractor:
+            extractor.pool.submit(int).result()
+            mouse_time, features = time_call(extractor.mouse_features, raw_df)
+            ip_time, parsed = time_call(parse_ips, ips, bytes_parser=extractor.parse_ipv4_bytes)
+        match = features.equals(expected_features) and all(
+            np.array_equal(a, b) for a, b in zip(parsed, expected_ips))
+        print(f"{n_jobs:>8} {mouse_time:>10.3f} {mouse_serial / mouse_time:>7.1f}x "
+              f"{ip_time:>13.3f} {ip_serial / ip_time:>7.1f}x  {match}")
+
+
+if __name__ == '__main__':
+    main()
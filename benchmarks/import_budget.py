@@ -0,0 +1,73 @@
+"""
+Import-time budget check for the serving entry points.
+
+Imports the scoring modules in a fresh interpreter and fails when that
+takes longer than the budget or pulls in a dependency that only training,
+plotting or face verification needs. Importing is timed in a subprocess so
+nothing this script has already loaded can hide the cost.
+
+Run from the repository root:
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget 1.0 --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVING_MODULES = ['models.scoring_service', 'models.risk_orchestrator']
+
+# Must only be imported when a training run, a plot or a face check needs them.
+# pyarrow is not listed: pandas imports it on its own when it is installed.
+DEFERRED_MODULES = ['xgboost', 'sklearn', 'matplotlib', 'faker', 'boto3', 'botocore',
+                    'requests', 'PIL', 'dotenv']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+loaded = sorted(name for name in {deferred!r} if name in sys.modules)
+print(json.dumps({{'seconds': elapsed, 'loaded': loaded}}))
+"""
+
+
+def measure(modules, deferred) -> dict:
+    """Imports `modules` in a new interpreter; returns its time and the deferred modules it loaded."""
+    code = PROBE.format(modules=list(modules), deferred=list(deferred))
+    output = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=1.5, help='Maximum import time in seconds.')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters to time; the fastest counts.')
+    parser.add_argument('--modules', nargs='+', default=SERVING_MODULES, help='Modules to import.')
+    args = parser.parse_args()
+
+    runs = [measure(args.modules, DEFERRED_MODULES) for _ in range(args.repeat)]
+    seconds = min(run['seconds'] for run in runs)
+    loaded = sorted(set().union(*(run['loaded'] for run in runs)))
+
+    print(f"import {', '.join(args.modules)}: {seconds:.3f} s (budget {args.budget:.3f} s)")
+    failed = False
+    if seconds > args.budget:
+        print(f"FAIL: import time is over budget by {seconds - args.budget:.3f} s")
+        failed = True
+    if loaded:
+        print(f"FAIL: deferred dependencies imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
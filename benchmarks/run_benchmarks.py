@@ -0,0 +1,229 @@
+"""
+Reproducible benchmark suite for every model's train and score path.
+
+Generates seeded synthetic inputs shaped like keyboard_data.csv,
+Test_Mouse.csv and the ASN/country tables at one or more sizes, trains the
+models on them in a scratch directory, and times:
+
+  - mouse feature extraction (one session, and a whole log in bulk)
+  - keystroke and mouse scaler+forest scoring, single and batch
+    (the pickled models, and the flattened NumPy forest)
+  - IPIntelligence load (from CSV and from its binary cache) and lookups
+  - device feature building and device-model inference, single and batch
+
+Results are written as JSON stamped with the git commit, so two runs can
+be compared with --compare.
+
+Run from the repository root:
+
+    python benchmarks/run_benchmarks.py --sizes small medium
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<commit>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The device model's training report draws a figure; never open a window
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import sklearn
+from synthetic import (make_keystroke_table, make_mouse_log, make_session, random_ips,
+                       random_user_agents, write_range_files)
+
+# Input sizes per preset
+SIZES = {
+    'small': {'keystroke_rows': 2_000, 'mouse_users': 200, 'events_per_user': 100,
+              'ip_ranges': 20_000, 'device_rows': 2_000, 'batch': 256},
+    'medium': {'keystroke_rows': 20_000, 'mouse_users': 2_000, 'events_per_user': 200,
+               'ip_ranges': 200_000, 'device_rows': 20_000, 'batch': 1_024},
+    'large': {'keystroke_rows': 200_000, 'mouse_users': 10_000, 'events_per_user': 500,
+              'ip_ranges': 500_000, 'device_rows': 200_000, 'batch': 4_096}
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Recorder:
+    """Times benchmark cases and collects their results."""
+    def __init__(self, size: str, repeat: int):
+        self.size = size
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name: str, func, items: int = 1, repeat: int = None):
+        """Runs `func` `repeat` times and records the median and best wall-clock time."""
+        times = []
+        result = None
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = func()
+            times.append(time.perf_counter() - start)
+        median = float(np.median(times))
+        self.results.append({
+            'name': name,
+            'size': self.size,
+            'items': items,
+            'median_s': median,
+            'min_s': float(min(times)),
+            'repeat': len(times),
+            'per_item_us': median / items * 1e6
+        })
+        print(f"  {name:<36} {median * 1000:>11.3f} ms   {median / items * 1e6:>11.2f} us/item")
+        return result
+
+
+def run_size(size: str, config: dict, repeat: int) -> list:
+    """Generates the inputs of one preset in a scratch directory and times every path."""
+    from models.model_registry import default_registry, get_model
+    from models.mouse_feature_extractor import extract_mouse_features, extract_mouse_features_bulk
+    from models.mouse_analytic import train_mouse_model
+    from models.keyboard_analytic import train_anomaly_model
+    from models.keyboard_model_test import score_keystrokes
+    from models.mouse_model_test import score_mouse
+    from models.flat_forest import export_flat_forest
+    from models.fingerprint_model import (IPIntelligence, generate_device_training_data, get_combined_features,
+                                   get_combined_features_batch, train_device_intelligence_model)
+
+    print(f"\n[{size}] {config}")
+    recorder = Recorder(size, repeat)
+    batch = config['batch']
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        # The training scripts read and write 'models/...' relative to the working directory
+        os.makedirs(os.path.join(scratch, 'models'))
+        os.chdir(scratch)
+        try:
+            keystrokes = make_keystroke_table(config['keystroke_rows'])
+            keystrokes.to_csv('models/keyboard_data.csv', index=False)
+            mouse_log = make_mouse_log(config['mouse_users'], config['events_per_user'])
+            mouse_log.to_csv('models/Test_Mouse.csv', index=False)
+            asn_path, country_path = write_range_files(config['ip_ranges'], 'models')
+
+            # --- Keystroke model ---
+            recorder.measure('keystroke.train', lambda: train_anomaly_model('models/keyboard_data.csv'),
+                             items=len(keystrokes), repeat=1)
+            default_registry.reload()
+            timings = keystrokes.drop(columns=['subject', 'sessionIndex', 'rep'])
+            score_keystrokes(timings.iloc[:1])  # load the model outside the timings
+            recorder.measure('keystroke.score_single', lambda: score_keystrokes(timings.iloc[:1]))
+            recorder.measure('keystroke.score_batch', lambda: score_keystrokes(timings.iloc[:batch]), items=batch)
+            flat = export_flat_forest(get_model('keyboard_model'), get_model('keyboard_scaler'))
+            single = timings.iloc[:1].to_numpy()
+            rows = timings.iloc[:batch].to_numpy()
+            recorder.measure('keystroke.flat_score_single', lambda: flat.decision_function(single))
+            recorder.measure('keystroke.flat_score_batch', lambda: flat.decision_function(rows), items=batch)
+
+            # --- Mouse model ---
+            session = make_session(config['events_per_user'])
+            recorder.measure('mouse.extract_session', lambda: extract_mouse_features(session),
+                             items=len(session))
+            features = recorder.measure('mouse.extract_bulk', lambda: extract_mouse_features_bulk(mouse_log),
+                                        items=len(mouse_log))
+            recorder.measure('mouse.train', lambda: train_mouse_model('models/Test_Mouse.csv'),
+                             items=len(mouse_log), repeat=1)
+            default_registry.reload()
+            score_mouse(features.iloc[:1])
+            mouse_batch = features.iloc[np.arange(batch) % len(features)]
+            recorder.measure('mouse.score_single', lambda: score_mouse(features.iloc[:1]))
+            recorder.measure('mouse.score_batch', lambda: score_mouse(mouse_batch), items=batch)
+
+            # --- IP intelligence ---
+            recorder.measure('ip.load_csv', lambda: IPIntelligence(asn_path, country_path, use_cache=False),
+                             items=config['ip_ranges'], repeat=1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                IPIntelligence(asn_path, country_path)  # writes the binary cache
+            ip_db = recorder.measure('ip.load_cache', lambda: IPIntelligence(asn_path, country_path),
+                                     items=config['ip_ranges'])
+            ips = random_ips(batch)
+            recorder.measure('ip.lookup_single', lambda: [ip_db.lookup_ip(ip) for ip in ips[:100]], items=100)
+            recorder.measure('ip.lookup_many', lambda: ip_db.lookup_many(ips), items=batch)
+
+            # --- Device model ---
+            recorder.measure('device.generate_training_data',
+                             lambda: generate_device_training_data(ip_db, n_rows=config['device_rows']),
+                             items=config['device_rows'])
+            recorder.measure('device.train',
+                             lambda: train_device_intelligence_model(ip_db, n_rows=config['device_rows']),
+                             items=config['device_rows'], repeat=1)
+            default_registry.reload()
+            device_model = get_model('device_model')
+            user_agents = random_user_agents(batch)
+            recorder.measure('device.score_single', lambda: device_model.predict_proba(
+                pd.DataFrame([get_combined_features(ips[0], user_agents[0], ip_db)])))
+            recorder.measure('device.score_batch', lambda: device_model.predict_proba(
+                get_combined_features_batch(ips, user_agents, ip_db)), items=batch)
+        finally:
+            os.chdir(cwd)
+            default_registry.reload()
+    return recorder.results
+
+
+def compare(results: list, baseline_path: str):
+    """Prints each case's median time relative to a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['size'], r['name']): r for r in baseline['results']}
+    print(f"\nCompared with {baseline['commit'][:10]} (ratio > 1 is slower now):")
+    for result in results:
+        old = previous.get((result['size'], result['name']))
+        if old is None:
+            continue
+        ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+        flag = '  <-- slower' if ratio > 1.2 else ''
+        print(f"  [{result['size']}] {result['name']:<36} {ratio:>6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small'], help='Input size presets.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the median is reported.')
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/<commit>.json).')
+    parser.add_argument('--compare', help='A previous results file to compare against.')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, SIZES[size], args.repeat))
+
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': {'numpy': np.__version__, 'pandas': pd.__version__, 'scikit-learn': sklearn.__version__},
+        'sizes': {size: SIZES[size] for size in args.sizes},
+        'repeat': args.repeat,
+        'results': results
+    }
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results', f"{commit[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to '{output}'")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
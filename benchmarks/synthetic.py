@@ -0,0 +1,130 @@
+"""
+Seeded synthetic inputs shaped like the repository's training files, shared
+by the benchmarks. Every generator is deterministic for a given seed, so
+results from different commits are measured on identical data.
+"""
+import os
+from ipaddress import ip_address
+
+import numpy as np
+import pandas as pd
+
+# Timing columns of keyboard_data.csv (the CMU keystroke dynamics layout)
+KEYSTROKE_TIMING_COLUMNS = [
+    'H.period', 'DD.period.t', 'UD.period.t', 'H.t', 'DD.t.i', 'UD.t.i', 'H.i', 'DD.i.e', 'UD.i.e',
+    'H.e', 'DD.e.five', 'UD.e.five', 'H.five', 'DD.five.Shift.r', 'UD.five.Shift.r', 'H.Shift.r',
+    'DD.Shift.r.o', 'UD.Shift.r.o', 'H.o', 'DD.o.a', 'UD.o.a', 'H.a', 'DD.a.n', 'UD.a.n', 'H.n',
+    'DD.n.l', 'UD.n.l', 'H.l', 'DD.l.Return', 'UD.l.Return', 'H.Return'
+]
+ORGANIZATIONS = ['Cloudflare, Inc.', 'Amazon.com, Inc.', 'Comcast Cable', 'NordVPN Proxy Services',
+                 'Deutsche Telekom AG', 'Example Hosting Ltd', 'Vodafone Mobile', 'Google LLC']
+COUNTRIES = ['US', 'DE', 'CN', 'RU', 'IR', 'GB', 'IN', 'AU']
+
+
+def make_keystroke_table(n_rows: int, n_subjects: int = 51, seed: int = 42) -> pd.DataFrame:
+    """Builds a keystroke timing table with the columns of keyboard_data.csv."""
+    rng = np.random.default_rng(seed)
+    subjects = rng.integers(0, n_subjects, size=n_rows)
+    # Each subject types with their own rhythm; hold times are short, flight times longer
+    rhythm = rng.uniform(0.05, 0.25, size=(n_subjects, len(KEYSTROKE_TIMING_COLUMNS)))
+    timings = np.abs(rhythm[subjects] + rng.normal(0, 0.03, size=(n_rows, len(KEYSTROKE_TIMING_COLUMNS))))
+    df = pd.DataFrame(timings, columns=KEYSTROKE_TIMING_COLUMNS)
+    df.insert(0, 'subject', [f"s{s:03d}" for s in subjects])
+    df.insert(1, 'sessionIndex', rng.integers(1, 9, size=n_rows))
+    df.insert(2, 'rep', rng.integers(1, 51, size=n_rows))
+    return df
+
+
+def make_session(n_events: int, seed: int = 42) -> pd.DataFrame:
+    """Builds one synthetic session shaped like the rows of Test_Mouse.csv."""
+    rng = np.random.default_rng(seed)
+    # Mostly moves with some clicks and other events, and a share of repeated
+    # timestamps so the zero-time-delta branch is exercised.
+    event_type = rng.choice([2, 5, 1], size=n_events, p=[0.85, 0.1, 0.05])
+    timestamp = 1_600_000_000_000 + np.cumsum(rng.integers(0, 40, size=n_events))
+    screen_x = np.clip(960 + np.cumsum(rng.integers(-15, 16, size=n_events)), 0, 1919)
+    screen_y = np.clip(540 + np.cumsum(rng.integers(-10, 11, size=n_events)), 0, 1079)
+    return pd.DataFrame({
+        'uid': 'user1',
+        'session_id': 'sessionA',
+        'timestamp': timestamp,
+        'event_type': event_type,
+        'screen_x': screen_x,
+        'screen_y': screen_y
+    })
+
+
+def make_mouse_log(n_users: int, events_per_user: int, seed: int = 42) -> pd.DataFrame:
+    """Builds a raw mouse event log like Test_Mouse.csv, with users' events interleaved."""
+    rng = np.random.default_rng(seed)
+    n_events = n_users * events_per_user
+    uids = np.repeat(np.arange(n_users), events_per_user)
+    steps = rng.integers(0, 40, size=n_events)
+    start = np.repeat(rng.integers(0, 3_600_000, size=n_users), events_per_user)
+    first = np.arange(n_events) % events_per_user == 0
+    # Per-user cumulative clocks and cursor paths
+    timestamp = start + np.cumsum(steps) - np.repeat(np.cumsum(steps)[first] - steps[first], events_per_user)
+    dx = rng.integers(-15, 16, size=n_events)
+    dy = rng.integers(-10, 11, size=n_events)
+    x = np.cumsum(dx) - np.repeat(np.cumsum(dx)[first] - dx[first], events_per_user)
+    y = np.cumsum(dy) - np.repeat(np.cumsum(dy)[first] - dy[first], events_per_user)
+    order = rng.permutation(n_events)
+    return pd.DataFrame({
+        'uid': np.array([f"u{u}" for u in range(n_users)], dtype=object)[uids[order]],
+        'session_id': 'a',
+        'timestamp': timestamp[order],
+        'event_type': rng.choice([2, 5, 1], size=n_events, p=[0.85, 0.1, 0.05]),
+        'screen_x': np.clip(960 + x[order], 0, 1919),
+        'screen_y': np.clip(540 + y[order], 0, 1079)
+    })
+
+
+def write_range_files(n_ranges: int, directory: str, seed: int = 42):
+    """Writes headerless ASN and country CSVs shaped like the real source files."""
+    rng = np.random.default_rng(seed)
+    bounds = np.sort(rng.choice(2**32 - 1, size=2 * n_ranges, replace=False))
+    starts, ends = bounds[0::2], bounds[1::2]
+    to_ip = np.vectorize(lambda x: str(ip_address(int(x))))
+
+    asn_df = pd.DataFrame({
+        'ip_start': to_ip(starts),
+        'ip_end': to_ip(ends),
+        'asn': rng.integers(1, 400_000, size=n_ranges),
+        'organization': rng.choice(ORGANIZATIONS, size=n_ranges)
+    })
+    # The country file shares most boundaries but splits some ranges in two,
+    # which leaves ASN-only and country-only rows after the outer merge.
+    split = rng.random(n_ranges) < 0.1
+    mid = starts + (ends - starts) // 2
+    c_starts = np.r_[starts[~split], starts[split], mid[split] + 1]
+    c_ends = np.r_[ends[~split], mid[split], ends[split]]
+    country_df = pd.DataFrame({
+        'ip_start': to_ip(c_starts),
+        'ip_end': to_ip(c_ends),
+        'country_code': rng.choice(COUNTRIES, size=len(c_starts))
+    })
+
+    asn_path = os.path.join(directory, 'asn-ipv4.csv')
+    country_path = os.path.join(directory, 'geo-whois-asn-country-ipv4.csv')
+    asn_df.to_csv(asn_path, header=False, index=False)
+    country_df.to_csv(country_path, header=False, index=False)
+    return asn_path, country_path
+
+
+def random_ips(n: int, seed: int = 7) -> list:
+    """Uniformly random IPv4 address strings."""
+    rng = np.random.default_rng(seed)
+    return [str(ip_address(int(x))) for x in rng.integers(0, 2**32, size=n)]
+
+
+def random_user_agents(n: int, seed: int = 7) -> list:
+    """A realistic mix of browser, outdated and headless user agents."""
+    agents = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+        'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+        'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36',
+        'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/45.0.2454.85 Safari/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HeadlessChrome/90.0.4430.212 Safari/537.36'
+    ]
+    rng = np.random.default_rng(seed)
+    return [agents[i] for i in rng.choice(len(agents), size=n, p=[0.45, 0.25, 0.2, 0.05, 0.05])]
@@ -0,0 +1,53 @@
+import importlib
+
+# Public names of the package and the module that defines each of them.
+# Nothing is imported until a name is first used, so `import models` is
+# instant and each entry point only pays for the modules it touches.
+_EXPORTS = {
+    # Scoring
+    'FraudScoringService': 'scoring_service',
+    'RiskOrchestrator': 'risk_orchestrator',
+    'score_keystrokes': 'keyboard_model_test',
+    'score_mouse': 'mouse_model_test',
+    'score_anomaly_batch': 'anomaly_scoring',
+    'FlatForest': 'flat_forest',
+    'get_model': 'model_registry',
+    'get_model_pair': 'model_registry',
+    'default_registry': 'model_registry',
+    # Features
+    'FEATURE_COLUMNS': 'mouse_feature_extractor',
+    'extract_mouse_features': 'mouse_feature_extractor',
+    'extract_mouse_features_bulk': 'mouse_feature_extractor',
+    'MouseSessionAccumulator': 'mouse_feature_extractor',
+    'IPIntelligence': 'fingerprint_model',
+    'get_combined_features': 'fingerprint_model',
+    'get_combined_features_batch': 'fingerprint_model',
+    'extract_ua_features': 'ua_features',
+    # Face verification
+    'FaceVerificationService': 'live_face',
+    'verify_facial_identity': 'live_face',
+    # Training
+    'train_anomaly_model': 'keyboard_analytic',
+    'train_mouse_model': 'mouse_analytic',
+    'train_device_intelligence_model': 'fingerprint_model',
+    'ParallelExtractor': 'parallel_extract',
+    'extract_mouse_features_parallel': 'parallel_extract',
+    'IncrementalRefresher': 'online_refresh',
+    'keyboard_refresher': 'online_refresh',
+    'mouse_refresher': 'online_refresh'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
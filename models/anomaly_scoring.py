@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from .instrumentation import timer
+
+# Result layout of every batched anomaly scoring call: one record per sample.
+# label is 1 for a normal (human) pattern and -1 for an anomaly (potential bot);
+# score is the decision_function value, where negative is more anomalous.
+SCORE_DTYPE = np.dtype([('label', np.int8), ('score', np.float64)])
+
+
+def score_anomaly_batch(model, scaler, batch, stage: str = 'anomaly') -> np.ndarray:
+    """
+    Scales a batch of samples and scores it with a fitted Isolation Forest,
+    using one scaler transform and one decision_function call for all rows.
+
+    Args:
+        model: A fitted IsolationForest.
+        scaler: The StandardScaler fitted alongside the model.
+        batch (pd.DataFrame or np.ndarray): N samples. DataFrame columns are
+                                            reordered to the training order;
+                                            arrays must already be in it.
+        stage (str): Prefix of the instrumentation timers, e.g. 'keyboard'.
+
+    Returns:
+        np.ndarray: N records of SCORE_DTYPE.
+    """
+    if isinstance(batch, pd.DataFrame):
+        feature_names = getattr(scaler, 'feature_names_in_', None)
+        if feature_names is not None:
+            batch = batch[feature_names]
+    else:
+        batch = np.atleast_2d(np.asarray(batch, dtype=np.float64))
+
+    results = np.empty(len(batch), dtype=SCORE_DTYPE)
+    if len(batch) == 0:
+        return results
+
+    with timer(f"{stage}.scaler_transform"):
+        scaled = scaler.transform(batch)
+    with timer(f"{stage}.decision_function"):
+        scores = model.decision_function(scaled)
+    # IsolationForest.predict is exactly this threshold on decision_function,
+    # so the labels come for free instead of scoring the batch twice
+    results['score'] = scores
+    results['label'] = np.where(scores < 0, -1, 1)
+    return results
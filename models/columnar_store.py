@@ -0,0 +1,251 @@
+import os
+import numpy as np
+import pandas as pd
+
+# pyarrow is imported on first use: it is only needed once data has been
+# converted, and it is too heavy to load on every import of the scoring path
+pa = ds = pq = None
+
+# Typed schemas of the raw logs once converted to Parquet
+MOUSE_SCHEMA = {
+    'uid': 'string',
+    'session_id': 'string',
+    'timestamp': 'int64',
+    'event_type': 'int16',
+    'screen_x': 'float64',
+    'screen_y': 'float64'
+}
+KEYSTROKE_ID_COLUMNS = {'subject': 'string', 'sessionIndex': 'int16', 'rep': 'int16'}
+ASN_COLUMNS = ['ip_start', 'ip_end', 'asn', 'organization']
+COUNTRY_COLUMNS = ['ip_start', 'ip_end', 'country_code']
+
+
+def _require_pyarrow():
+    global pa, ds, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.dataset
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet files. Install it with 'pip install pyarrow'.")
+        pa, ds, pq = pyarrow, pyarrow.dataset, pyarrow.parquet
+
+
+def is_columnar(path: str) -> bool:
+    """True if `path` is a Parquet file or a directory holding a Parquet dataset."""
+    return path.endswith('.parquet') or os.path.isdir(path)
+
+
+def uid_buckets(uids, n_buckets: int) -> np.ndarray:
+    """Stable hash bucket of every uid, used as the mouse log partition key."""
+    hashes = pd.util.hash_array(np.asarray(uids, dtype=object), categorize=False)
+    return (hashes % np.uint64(n_buckets)).astype(np.int16)
+
+
+# --- Raw Mouse Logs ---
+
+def convert_mouse_log(csv_path: str, out_dir: str, partition_by: str = 'uid', n_buckets: int = 64,
+                      chunksize: int = 1_000_000):
+    """
+    Converts a raw mouse event CSV into a typed, partitioned Parquet dataset.
+
+    Args:
+        csv_path (str): CSV with uid, session_id, timestamp, event_type, screen_x, screen_y.
+        out_dir (str): Directory the dataset is written to (hive-style partitions).
+        partition_by (str): 'uid' to partition by a stable hash bucket of the uid,
+                            or 'date' to partition by the UTC day of the timestamp (ms).
+        n_buckets (int): Number of uid buckets when partitioning by uid.
+        chunksize (int): Number of CSV rows converted at a time.
+    """
+    _require_pyarrow()
+    if partition_by not in ('uid', 'date'):
+        raise ValueError("partition_by must be 'uid' or 'date'.")
+
+    if os.path.isdir(out_dir) and os.listdir(out_dir):
+        raise FileExistsError(f"'{out_dir}' already contains data; remove it or choose another directory.")
+
+    partition_column = 'uid_bucket' if partition_by == 'uid' else 'date'
+    schema = pa.schema([(name, pa.type_for_alias(alias)) for name, alias in MOUSE_SCHEMA.items()])
+    schema = schema.append(pa.field(partition_column, pa.int16() if partition_by == 'uid' else pa.string()))
+
+    print(f"Converting '{csv_path}' to Parquet in '{out_dir}' (partitioned by {partition_by})...")
+    rows = 0
+    chunks = pd.read_csv(csv_path, usecols=list(MOUSE_SCHEMA), dtype=MOUSE_SCHEMA, chunksize=chunksize)
+    for i, chunk in enumerate(chunks):
+        if partition_by == 'uid':
+            chunk['uid_bucket'] = uid_buckets(chunk['uid'], n_buckets)
+        else:
+            chunk['date'] = pd.to_datetime(chunk['timestamp'], unit='ms', utc=True).dt.strftime('%Y-%m-%d')
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        ds.write_dataset(
+            table, out_dir, format='parquet', schema=schema,
+            partitioning=ds.partitioning(pa.schema([schema.field(partition_column)]), flavor='hive'),
+            basename_template=f"part-{i}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        rows += len(chunk)
+
+    if partition_by == 'uid':
+        # Readers need the bucket count to turn a uid filter into a partition filter.
+        # Names starting with '_' are ignored by the Parquet dataset reader.
+        with open(os.path.join(out_dir, '_n_buckets'), 'w') as f:
+            f.write(str(n_buckets))
+    print(f"Wrote {rows} mouse events.")
+
+
+def read_mouse_events(path: str, columns=None, uids=None, start_time=None, end_time=None) -> pd.DataFrame:
+    """
+    Reads raw mouse events from a Parquet dataset, reading only the requested
+    columns and pushing the uid and time filters down to the files.
+
+    Args:
+        path (str): Dataset directory written by convert_mouse_log (or one .parquet file).
+        columns (list): Columns to read. Defaults to the six raw log columns.
+        uids (list): Only return events of these users.
+        start_time (int): Only return events at or after this timestamp (ms).
+        end_time (int): Only return events before this timestamp (ms).
+
+    Returns:
+        pd.DataFrame: The matching events.
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    columns = list(MOUSE_SCHEMA) if columns is None else list(columns)
+
+    conditions = []
+    if uids is not None:
+        uids = list(uids)
+        conditions.append(ds.field('uid').isin(uids))
+        # The bucket condition lets whole partitions be skipped
+        if 'uid_bucket' in dataset.schema.names:
+            n_buckets = _bucket_count(path)
+            if n_buckets:
+                conditions.append(ds.field('uid_bucket').isin(np.unique(uid_buckets(uids, n_buckets)).tolist()))
+    if start_time is not None:
+        conditions.append(ds.field('timestamp') >= start_time)
+    if end_time is not None:
+        conditions.append(ds.field('timestamp') < end_time)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def _bucket_count(path: str) -> int:
+    """Number of uid buckets recorded by convert_mouse_log, or 0 if unknown."""
+    meta_path = os.path.join(path, '_n_buckets')
+    if not os.path.exists(meta_path):
+        return 0
+    with open(meta_path) as f:
+        return int(f.read())
+
+
+# --- Keystroke Tables ---
+
+def convert_keystrokes(csv_path: str, out_path: str, chunksize: int = 500_000):
+    """
+    Converts a keystroke timing CSV (keyboard_data.csv layout) to one Parquet
+    file with float32 timing columns.
+
+    Args:
+        csv_path (str): CSV with subject, sessionIndex, rep and the timing columns.
+        out_path (str): The .parquet file to write.
+        chunksize (int): Number of CSV rows converted at a time.
+    """
+    _require_pyarrow()
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {col: KEYSTROKE_ID_COLUMNS.get(col, 'float32') for col in columns}
+
+    print(f"Converting '{csv_path}' to '{out_path}'...")
+    writer = None
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"Wrote {rows} keystroke samples.")
+
+
+def keystroke_feature_columns(path: str) -> list:
+    """The timing columns of a keystroke table, read from the Parquet schema or CSV header."""
+    if is_columnar(path):
+        _require_pyarrow()
+        names = ds.dataset(path, format='parquet').schema.names
+    else:
+        names = list(pd.read_csv(path, nrows=0).columns)
+    return [name for name in names if name not in KEYSTROKE_ID_COLUMNS]
+
+
+def read_keystrokes(path: str, columns=None, subjects=None) -> pd.DataFrame:
+    """
+    Reads a keystroke table from Parquet, reading only the requested columns
+    and pushing an optional subject filter down to the file.
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(path, format='parquet')
+    expression = ds.field('subject').isin(list(subjects)) if subjects is not None else None
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def iter_keystroke_batches(path: str, columns, batch_size: int = 100_000):
+    """Yields a Parquet keystroke table as DataFrames of at most `batch_size` rows."""
+    _require_pyarrow()
+    dataset = ds.dataset(path, format='parquet')
+    for batch in dataset.to_batches(columns=list(columns), batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+# --- IP Range Tables ---
+
+def convert_ip_tables(asn_csv: str, country_csv: str, out_dir: str):
+    """
+    Converts the headerless ASN and country range CSVs into Parquet files that
+    IPIntelligence can load directly ('asn-ipv4.parquet' and
+    'geo-whois-asn-country-ipv4.parquet' in `out_dir`).
+    """
+    _require_pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    for csv_path, names, dtypes in [
+        (asn_csv, ASN_COLUMNS, {'ip_start': 'string', 'ip_end': 'string', 'asn': 'Int64', 'organization': 'string'}),
+        (country_csv, COUNTRY_COLUMNS, {'ip_start': 'string', 'ip_end': 'string', 'country_code': 'string'})
+    ]:
+        out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(csv_path))[0] + '.parquet')
+        print(f"Converting '{csv_path}' to '{out_path}'...")
+        df = pd.read_csv(csv_path, header=None, names=names, dtype=dtypes, on_bad_lines='skip')
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), out_path)
+        outputs.append(out_path)
+    return outputs
+
+
+def read_ip_table(path: str, columns) -> pd.DataFrame:
+    """Reads an IP range table written by convert_ip_tables, as object columns."""
+    _require_pyarrow()
+    df = pq.read_table(path, columns=list(columns)).to_pandas()
+    # Match what the CSV reader produces, so the merge behaves identically
+    for column in df.columns:
+        if column != 'asn':
+            df[column] = df[column].astype(object).where(df[column].notna(), np.nan)
+    return df
+
+
+if __name__ == '__main__':
+    # Convert the raw training files that are present to their columnar form
+    if os.path.exists('models/Test_Mouse.csv'):
+        try:
+            convert_mouse_log('models/Test_Mouse.csv', 'models/mouse_events')
+        except FileExistsError as e:
+            print(f"Skipping the mouse log: {e}")
+    if os.path.exists('models/keyboard_data.csv'):
+        convert_keystrokes('models/keyboard_data.csv', 'models/keyboard_data.parquet')
+    if os.path.exists('models/asn-ipv4.csv') and os.path.exists('models/geo-whois-asn-country-ipv4.csv'):
+        convert_ip_tables('models/asn-ipv4.csv', 'models/geo-whois-asn-country-ipv4.csv', 'models')
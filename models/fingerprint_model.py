@@ -1,58 +1,268 @@
 import pandas as pd
 import joblib
-import random
-from faker import Faker
-from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, ConfusionMatrixDisplay
-import matplotlib.pyplot as plt
-from ipaddress import ip_address
+import heapq
+import contextlib
+import json
+import os
+import time
+import numpy as np
+from ipaddress import ip_address, ip_network
+from .lru_cache import LRUCache, MISSING
+from .instrumentation import timed, timer
+from .ua_features import extract_ua_features, extract_ua_features_bulk
+from .columnar_store import ASN_COLUMNS, COUNTRY_COLUMNS, read_ip_table
+
+try:
+    import fcntl
+except ImportError:  # Windows: cache writers are not serialized
+    fcntl = None
 
 # --- Configuration ---
 # This file should contain IP ranges mapped to an organization name (e.g., Cloudflare, Inc.)
 ASN_FILE_PATH = "models/asn-ipv4.csv" 
 # This file should contain IP ranges mapped to a country code (e.g., AU, CN)
 COUNTRY_FILE_PATH = "models/geo-whois-asn-country-ipv4.csv"
+# Bump this whenever the layout of the on-disk IP intelligence cache changes
+IP_CACHE_VERSION = 2
+# User agents of the suspicious (automated) samples in the synthetic training data
+BOT_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/45.0.2454.85 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HeadlessChrome/90.0.4430.212 Safari/537.36"
+]
+# Address space the trusted samples are drawn from
+PRIVATE_NETWORKS = [ip_network('10.0.0.0/8'), ip_network('172.16.0.0/12'), ip_network('192.168.0.0/16')]
 
 # --- Part 1: IP Intelligence Database Loader 
 
+def build_interval_index(starts, ends):
+    """
+    Builds a sorted, non-overlapping interval index over possibly overlapping
+    IP ranges so that a lookup is a single binary search.
+
+    Where ranges overlap, every address is assigned to the covering range that
+    comes first in the input order, which is the row a full-table scan followed
+    by `.iloc[0]` would return.
+
+    Args:
+        starts (np.ndarray): First address of every range as an integer.
+        ends (np.ndarray): Last address of every range as an integer.
+
+    Returns:
+        tuple: (segment_starts, segment_ends, segment_rows) int64 arrays, sorted by
+               start, where segment_rows holds the input position of the range
+               that owns each segment.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    rows = np.flatnonzero(starts <= ends)  # an empty range can never match
+
+    # Sort by start address, then by input order so earlier rows win ties
+    order = rows[np.lexsort((rows, starts[rows]))]
+    s, e = starts[order], ends[order]
+    if len(order) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    # Split the ranges into clusters of mutually overlapping ones. A range that
+    # overlaps nothing is already a final segment; only real clusters need a sweep.
+    reach = np.maximum.accumulate(e)
+    new_cluster = np.r_[True, s[1:] > reach[:-1]]
+    cluster_starts = np.flatnonzero(new_cluster)
+    cluster_sizes = np.diff(np.r_[cluster_starts, len(order)])
+
+    seg_starts = [s[cluster_starts[cluster_sizes == 1]]]
+    seg_ends = [e[cluster_starts[cluster_sizes == 1]]]
+    seg_rows = [order[cluster_starts[cluster_sizes == 1]]]
+
+    for first, size in zip(cluster_starts[cluster_sizes > 1], cluster_sizes[cluster_sizes > 1]):
+        c_starts = s[first:first + size].tolist()
+        c_ends = e[first:first + size].tolist()
+        c_rows = order[first:first + size].tolist()
+        # Every point where the set of covering ranges can change
+        bounds = sorted(set(c_starts) | {end + 1 for end in c_ends})
+        active = []  # heap of (row, end) for ranges that have started
+        nxt = 0
+        out_s, out_e, out_r = [], [], []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            while nxt < size and c_starts[nxt] == lo:
+                heapq.heappush(active, (c_rows[nxt], c_ends[nxt]))
+                nxt += 1
+            while active and active[0][1] < lo:
+                heapq.heappop(active)
+            if not active:
+                continue
+            row = active[0][0]
+            if out_r and out_r[-1] == row and out_e[-1] == lo - 1:
+                out_e[-1] = hi - 1  # extend the previous segment of the same range
+            else:
+                out_s.append(lo)
+                out_e.append(hi - 1)
+                out_r.append(row)
+        seg_starts.append(np.array(out_s, dtype=np.int64))
+        seg_ends.append(np.array(out_e, dtype=np.int64))
+        seg_rows.append(np.array(out_r, dtype=np.int64))
+
+    seg_starts = np.concatenate(seg_starts)
+    seg_ends = np.concatenate(seg_ends)
+    seg_rows = np.concatenate(seg_rows)
+    by_start = np.argsort(seg_starts, kind='stable')
+    return seg_starts[by_start], seg_ends[by_start], seg_rows[by_start]
+
+
+def classify_organization(org: str) -> str:
+    """Maps a lower-cased organization name to the IP type used as a model feature."""
+    if any(kw in org for kw in ['cloud', 'hosting', 'datacenter', 'cdn', 'google', 'amazon', 'cloudflare']):
+        return 'Data Center'
+    elif any(kw in org for kw in ['vpn', 'proxy']):
+        return 'VPN/Proxy'
+    return 'Residential/Mobile'
+
+
+def _parse_ipv4_bytes(raw):
+    """
+    Parses dotted-quad IPv4 addresses stored as a fixed-width bytes array,
+    one character column at a time. Returns (ip_ints, is_valid); anything
+    `ipaddress` would reject (leading zeros, octets over 255, ...) is invalid.
+    """
+    chars = raw.view(np.uint8).reshape(len(raw), raw.dtype.itemsize)
+    n = len(raw)
+    value = np.zeros(n, dtype=np.int64)
+    octet = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int64)
+    dots = np.zeros(n, dtype=np.int64)
+    is_valid = np.ones(n, dtype=bool)
+    ended = np.zeros(n, dtype=bool)
+
+    for j in range(chars.shape[1]):
+        c = chars[:, j]
+        ended |= c == 0
+        is_digit = ~ended & (c >= ord('0')) & (c <= ord('9'))
+        is_dot = ~ended & (c == ord('.'))
+        is_valid &= ended | is_digit | is_dot
+
+        # A dot closes the current octet
+        is_valid &= ~is_dot | ((digits > 0) & (octet <= 255))
+        value = np.where(is_dot, (value << 8) | octet, value)
+        dots += is_dot
+        octet[is_dot] = 0
+        digits[is_dot] = 0
+
+        # A digit extends it; a leading zero is only allowed on its own
+        is_valid &= ~is_digit | ~((digits == 1) & (octet == 0))
+        octet = np.where(is_digit, octet * 10 + (c.astype(np.int64) - ord('0')), octet)
+        digits += is_digit
+        is_valid &= digits <= 3
+
+    # The last octet is closed by the end of the string (or of the field)
+    is_valid &= (dots == 3) & (digits > 0) & (octet <= 255) & ended
+    return (value << 8) | octet, is_valid
+
+
+def parse_ips(ips, max_value=2**32 - 1, bytes_parser=None):
+    """
+    Converts many IP address strings to integers at once.
+
+    Dotted-quad IPv4 strings are parsed column-wise as fixed-width bytes;
+    anything else falls back to `ipaddress.ip_address` one by one, so the
+    accepted inputs are the same as in lookup_ip.
+
+    Args:
+        ips (list-like): IP address strings, or integers that are used as-is.
+        max_value (int): Parsed addresses above this are reported as invalid,
+                         since they cannot fall inside any IPv4 range.
+        bytes_parser (callable): Replaces _parse_ipv4_bytes for the fast path,
+                                 e.g. ParallelExtractor.parse_ipv4_bytes to
+                                 spread it over worker processes.
+
+    Returns:
+        tuple: (ip_ints, is_valid) as an int64 array and a boolean array.
+    """
+    ips = pd.Series(ips, copy=False)
+    if pd.api.types.is_integer_dtype(ips.dtype):
+        ip_ints = ips.to_numpy(dtype=np.int64)
+        return ip_ints, (ip_ints >= 0) & (ip_ints <= max_value)
+
+    ips = ips.astype(object)
+    try:
+        # One spare byte so that anything longer than 15 characters ends up invalid
+        raw = np.array(ips.tolist(), dtype='S16')
+        ip_ints, is_valid = (bytes_parser or _parse_ipv4_bytes)(raw)
+    except UnicodeEncodeError:
+        ip_ints = np.zeros(len(ips), dtype=np.int64)
+        is_valid = np.zeros(len(ips), dtype=bool)
+
+    # Rare inputs (IPv6, unusual spellings, junk) take the slow exact path
+    for i in np.flatnonzero(~is_valid):
+        try:
+            value = int(ip_address(ips.iat[i]))
+        except ValueError:
+            continue
+        if value <= max_value:
+            ip_ints[i] = value
+            is_valid[i] = True
+    return ip_ints, is_valid
+
+
 class IPIntelligence:
     """
     A class to load and query IP intelligence data from multiple source files.
     It merges ASN and Country data into a unified, fast lookup system.
+
+    The merged database is kept as plain arrays (uint32 range bounds plus small
+    integer organization and country codes) and is written once to a versioned
+    binary cache next to the source files. Later starts memory-map that cache,
+    so worker processes share one page-cached copy and skip CSV parsing; the
+    cache is rebuilt automatically when either source CSV changes.
+
+    Optionally, a bounded LRU cache with a time-to-live sits in front of
+    lookup_ip (keyed by integer IP) and get_combined_features (keyed by
+    (ip, user_agent)), since production traffic repeats the same NAT and
+    corporate egress addresses constantly.
     """
-    def __init__(self, asn_filepath, country_filepath):
-        self.ip_db = None
-        try:
-            print(f"Loading ASN data from: {asn_filepath}")
-            asn_df = pd.read_csv(
-                asn_filepath, 
-                header=None, 
-                names=['ip_start', 'ip_end', 'asn', 'organization'],
-                # Use a more robust CSV engine for potentially large files
-                engine='python', 
-                on_bad_lines='skip'
-            )
+    def __init__(self, asn_filepath, country_filepath, cache_dir=None, use_cache=True,
+                 lookup_cache_size=0, lookup_cache_ttl=None, parallel=None):
+        """
+        Args:
+            asn_filepath (str): CSV of IP ranges mapped to ASN organizations.
+            country_filepath (str): CSV of IP ranges mapped to country codes.
+            cache_dir (str): Where the binary database cache lives. Defaults to
+                             'ip_intel_cache' next to the ASN file.
+            use_cache (bool): Set to False to always parse the CSVs.
+            lookup_cache_size (int): Entries kept in each hot-IP LRU cache; 0
+                                     disables them.
+            lookup_cache_ttl (float): Seconds a cached answer stays valid, or
+                                      None to keep it until evicted or reloaded.
+            parallel (ParallelExtractor): Process pool used to convert the IP
+                                          range strings when the CSVs are parsed.
+        """
+        self.lookup_cache = None
+        self.features_cache = None
+        if lookup_cache_size > 0:
+            self.lookup_cache = LRUCache(lookup_cache_size, lookup_cache_ttl)
+            self.features_cache = LRUCache(lookup_cache_size, lookup_cache_ttl)
+        self._tables = None
+        self._ip_db = None
+        self.range_starts = None
+        self.range_ends = None
+        self.asn_filepath = asn_filepath
+        self.country_filepath = country_filepath
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(asn_filepath) or '.', 'ip_intel_cache')
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.parallel = parallel
+        self._load()
 
-            print(f"Loading Country data from: {country_filepath}")
-            country_df = pd.read_csv(
-                country_filepath,
-                header=None,
-                names=['ip_start', 'ip_end', 'country_code'],
-                engine='python',
-                on_bad_lines='skip'
-            )
-            
-            print("Merging IP intelligence data...")
-            # We merge the two datasets based on the IP start and end ranges
-            # This creates a single, unified DataFrame for lookups
-            self.ip_db = pd.merge(asn_df, country_df, on=['ip_start', 'ip_end'], how='outer')
-
-            # Convert IP strings to integers for fast searching
-            self.ip_db['ip_start_int'] = self.ip_db['ip_start'].apply(lambda x: int(ip_address(x)))
-            self.ip_db['ip_end_int'] = self.ip_db['ip_end'].apply(lambda x: int(ip_address(x)))
-            # Fill any missing values that might result from the merge
-            self.ip_db.fillna('Unknown', inplace=True)
+    def _load(self):
+        """Loads the database from the binary cache, or from the CSVs if it is stale."""
+        try:
+            with timer('ip.load'):
+                tables = self._load_cache() if self.use_cache else None
+                if tables is None:
+                    tables = self._load_sources()
+                    if self.use_cache:
+                        self._save_cache(tables)
+            self._init_from_tables(tables)
             print("IP intelligence database loaded and merged successfully.")
 
         except FileNotFoundError as e:
@@ -61,38 +271,330 @@ class IPIntelligence:
         except Exception as e:
             print(f"An error occurred while loading IP data: {e}")
 
+    def reload(self):
+        """
+        Re-reads the source data (picking up changed CSVs) and invalidates the
+        hot-IP caches so no answer from the old data is served afterwards.
+        """
+        self._tables = None
+        self._ip_db = None
+        self.range_starts = None
+        self._load()
+        self.invalidate_caches()
+
+    def invalidate_caches(self):
+        """Drops every cached lookup and feature answer."""
+        for cache in (self.lookup_cache, self.features_cache):
+            if cache is not None:
+                cache.clear()
+
+    def cache_stats(self) -> dict:
+        """Returns the hit/miss/eviction counters of the hot-IP caches."""
+        return {
+            'lookup_ip': self.lookup_cache.stats() if self.lookup_cache is not None else None,
+            'combined_features': self.features_cache.stats() if self.features_cache is not None else None
+        }
+
+    def _load_sources(self) -> dict:
+        """Parses and merges the source tables into the array tables used for lookups."""
+        print(f"Loading ASN data from: {self.asn_filepath}")
+        asn_df = self._read_range_table(self.asn_filepath, ASN_COLUMNS)
+
+        print(f"Loading Country data from: {self.country_filepath}")
+        country_df = self._read_range_table(self.country_filepath, COUNTRY_COLUMNS)
+        
+        print("Merging IP intelligence data...")
+        # We merge the two datasets based on the IP start and end ranges
+        # This creates a single, unified DataFrame for lookups
+        merged = pd.merge(asn_df, country_df, on=['ip_start', 'ip_end'], how='outer')
+
+        # Convert IP strings to integers for fast searching
+        bytes_parser = self.parallel.parse_ipv4_bytes if self.parallel is not None else None
+        ip_start, start_ok = parse_ips(merged['ip_start'], bytes_parser=bytes_parser)
+        ip_end, end_ok = parse_ips(merged['ip_end'], bytes_parser=bytes_parser)
+        keep = start_ok & end_ok
+        if not keep.all():
+            print(f"Skipping {int((~keep).sum())} rows with unparseable IPv4 ranges.")
+            merged = merged[keep]
+            ip_start, ip_end = ip_start[keep], ip_end[keep]
+
+        # Fill any missing values that might result from the merge, then
+        # dictionary-encode the names
+        org_codes, organizations = pd.factorize(merged['organization'].fillna('Unknown').astype(str))
+        country_codes, countries = pd.factorize(merged['country_code'].fillna('Unknown').astype(str))
+
+        # Build the interval index once so every lookup is a binary search
+        segment_starts, segment_ends, segment_rows = build_interval_index(ip_start, ip_end)
+
+        return {
+            'ip_start': ip_start.astype(np.uint32),
+            'ip_end': ip_end.astype(np.uint32),
+            'org_codes': org_codes.astype(np.int32),
+            'country_codes': country_codes.astype(np.int16),
+            'segment_starts': segment_starts.astype(np.uint32),
+            'segment_ends': segment_ends.astype(np.uint32),
+            # Codes of the row that owns each segment, so lookups skip the row hop
+            'segment_org_codes': org_codes[segment_rows].astype(np.int32),
+            'segment_country_codes': country_codes[segment_rows].astype(np.int16),
+            'organizations': list(organizations),
+            'countries': list(countries)
+        }
+
+    @staticmethod
+    def _read_range_table(path: str, names: list) -> pd.DataFrame:
+        """Reads one headerless range CSV, or its Parquet conversion from columnar_store.py."""
+        if path.endswith('.parquet'):
+            # Typed columns: no text parsing, and the unused asn column is skipped
+            return read_ip_table(path, [name for name in names if name != 'asn'])
+        return pd.read_csv(
+            path, 
+            header=None, 
+            names=names,
+            # Use a more robust CSV engine for potentially large files
+            engine='python', 
+            on_bad_lines='skip'
+        )
+
+    def _source_fingerprints(self) -> list:
+        """Identifies the current version of each source CSV by path, size and mtime."""
+        fingerprints = []
+        for path in (self.asn_filepath, self.country_filepath):
+            stat = os.stat(path)
+            fingerprints.append({'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+        return fingerprints
+
+    def _load_cache(self):
+        """Memory-maps the binary cache, or returns None if it is missing or stale."""
+        meta_path = os.path.join(self.cache_dir, 'meta.json')
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get('version') != IP_CACHE_VERSION or meta.get('sources') != self._source_fingerprints():
+            print("IP intelligence cache is out of date and will be rebuilt.")
+            return None
+
+        print(f"Loading IP intelligence cache from: {self.cache_dir}")
+        try:
+            tables = {
+                name: np.load(os.path.join(self.cache_dir, filename), mmap_mode='r')
+                for name, filename in meta['arrays'].items()
+            }
+        except (OSError, ValueError) as e:
+            # A missing or truncated array makes the whole cache stale
+            print(f"IP intelligence cache is incomplete and will be rebuilt: {e}")
+            return None
+        tables['organizations'] = meta['organizations']
+        tables['countries'] = meta['countries']
+        return tables
+
+    def _cache_is_current(self) -> bool:
+        """True if the published cache matches the sources and all of its arrays exist."""
+        try:
+            with open(os.path.join(self.cache_dir, 'meta.json')) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        return (meta.get('version') == IP_CACHE_VERSION
+                and meta.get('sources') == self._source_fingerprints()
+                and all(os.path.exists(os.path.join(self.cache_dir, filename))
+                        for filename in meta['arrays'].values()))
+
+    @contextlib.contextmanager
+    def _cache_lock(self):
+        """Holds an exclusive inter-process lock on the cache directory (a no-op without fcntl)."""
+        with open(os.path.join(self.cache_dir, 'cache.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Closing the file releases the lock
+            yield
+
+    def _save_cache(self, tables: dict):
+        """
+        Writes the array tables to the cache directory. Arrays go to fresh
+        files first and meta.json is swapped in last, so readers never see
+        a half-written cache. Writers hold the cache lock throughout, so two
+        processes rebuilding at once can never delete each other's arrays.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._cache_lock():
+                self._write_cache(tables)
+        except OSError as e:
+            print(f"Warning: could not write the IP intelligence cache: {e}")
+
+    def _write_cache(self, tables: dict):
+        """Publishes a new cache generation; called with the cache lock held."""
+        if self._cache_is_current():
+            # Another process rebuilt it while this one was parsing the CSVs
+            return
+        token = f"{time.time_ns()}-{os.getpid()}"
+        arrays = {}
+        for name, values in tables.items():
+            if isinstance(values, np.ndarray):
+                arrays[name] = f"{name}-{token}.npy"
+                np.save(os.path.join(self.cache_dir, arrays[name]), values)
+
+        meta = {
+            'version': IP_CACHE_VERSION,
+            'sources': self._source_fingerprints(),
+            'arrays': arrays,
+            'organizations': tables['organizations'],
+            'countries': tables['countries']
+        }
+        tmp_path = os.path.join(self.cache_dir, f"meta-{token}.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.cache_dir, 'meta.json'))
+
+        # Under the lock, no other writer has unpublished arrays in the directory,
+        # so every array the new meta.json does not name is an old generation.
+        # Processes that still map one keep its pages until they exit.
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.npy') and filename not in arrays.values():
+                os.remove(os.path.join(self.cache_dir, filename))
+        print(f"IP intelligence cache written to: {self.cache_dir}")
+
+    def _init_from_tables(self, tables: dict):
+        """Sets up the lookup arrays from the loaded tables."""
+        # Plain ndarray views over the (possibly memory-mapped) data; np.memmap
+        # adds per-call overhead that would dominate single lookups
+        tables = {name: np.asarray(values) if isinstance(values, np.ndarray) else values
+                  for name, values in tables.items()}
+        self._tables = tables
+        self.range_starts = tables['segment_starts']
+        self.range_ends = tables['segment_ends']
+        self._segment_orgs = tables['segment_org_codes']
+        self._segment_countries = tables['segment_country_codes']
+
+        # The keyword classification runs once per distinct organization
+        self._org_names = np.array([org.lower() for org in tables['organizations']], dtype=object)
+        self._org_ip_types = np.array([classify_organization(org) for org in self._org_names], dtype=object)
+        self._country_names = np.array(tables['countries'], dtype=object)
+
+    @property
+    def ip_db(self):
+        """
+        The merged database as a DataFrame, or None if loading failed. It is
+        only needed for training, so it is built on first access.
+
+        The layout is compact: uint32 range bounds and categorical organization
+        and country columns that share the cached code arrays' string tables.
+        """
+        if self._ip_db is None and self._tables is not None:
+            tables = self._tables
+            self._ip_db = pd.DataFrame({
+                'ip_start_int': tables['ip_start'],
+                'ip_end_int': tables['ip_end'],
+                'organization': pd.Categorical.from_codes(tables['org_codes'], categories=tables['organizations']),
+                'country_code': pd.Categorical.from_codes(tables['country_codes'], categories=tables['countries'])
+            })
+        return self._ip_db
+
+    def memory_report(self) -> dict:
+        """
+        Prints and returns the number of bytes held by each column of ip_db and
+        by each lookup structure.
+        """
+        report = {}
+        if self.ip_db is not None:
+            for column, nbytes in self.ip_db.memory_usage(index=False, deep=True).items():
+                report[f"ip_db.{column}"] = int(nbytes)
+        if self.range_starts is not None:
+            report['index.range_starts'] = self.range_starts.nbytes
+            report['index.range_ends'] = self.range_ends.nbytes
+            report['index.segment_org_codes'] = self._segment_orgs.nbytes
+            report['index.segment_country_codes'] = self._segment_countries.nbytes
+            report['index.string_tables'] = int(
+                sum(len(name) for name in self._org_names) + sum(len(name) for name in self._country_names)
+            )
+
+        print("\n--- IP Intelligence Memory Report ---")
+        for name, nbytes in report.items():
+            print(f"{name:<32} {nbytes:>14,} bytes")
+        print(f"{'total':<32} {sum(report.values()):>14,} bytes")
+        return report
+
+    @timed('ip.lookup')
     def lookup_ip(self, ip_str: str) -> dict:
         """Looks up an IP address in the merged database."""
-        if self.ip_db is None:
+        if self.range_starts is None:
             return {'organization': 'Unknown', 'ip_type': 'Unknown', 'country': 'Unknown'}
 
         try:
             ip_int = int(ip_address(ip_str))
-            result = self.ip_db[
-                (self.ip_db['ip_start_int'] <= ip_int) & 
-                (self.ip_db['ip_end_int'] >= ip_int)
-            ]
-
-            if not result.empty:
-                row = result.iloc[0]
-                org = str(row['organization']).lower()
-                country = str(row['country_code'])
-                
-                if any(kw in org for kw in ['cloud', 'hosting', 'datacenter', 'cdn', 'google', 'amazon', 'cloudflare']):
-                    ip_type = 'Data Center'
-                elif any(kw in org for kw in ['vpn', 'proxy']):
-                    ip_type = 'VPN/Proxy'
-                else:
-                    ip_type = 'Residential/Mobile'
-                return {'organization': org, 'ip_type': ip_type, 'country': country}
         except ValueError:
-            pass
+            return {'organization': 'Unknown', 'ip_type': 'Unknown', 'country': 'Unknown'}
+
+        if self.lookup_cache is None:
+            return self._lookup_int(ip_int)
+        result = self.lookup_cache.get(ip_int)
+        if result is MISSING:
+            result = self._lookup_int(ip_int)
+            self.lookup_cache.put(ip_int, result)
+        # Hand out a copy so callers cannot modify the cached answer
+        return dict(result)
+
+    def _lookup_int(self, ip_int: int) -> dict:
+        """Resolves an integer IP address with a binary search over the interval index."""
+        # Segments never overlap, so the last one reaches the highest address
+        if len(self.range_starts) and ip_int <= int(self.range_ends[-1]):
+            # Search with a scalar of the index's own dtype; a Python int would
+            # make NumPy cast the whole index to int64 on every call
+            i = int(self.range_starts.searchsorted(self.range_starts.dtype.type(ip_int), side='right')) - 1
+            if i >= 0 and ip_int <= self.range_ends[i]:
+                org = self._segment_orgs[i]
+                return {
+                    'organization': self._org_names[org],
+                    'ip_type': self._org_ip_types[org],
+                    'country': self._country_names[self._segment_countries[i]]
+                }
         return {'organization': 'Unknown', 'ip_type': 'Unknown', 'country': 'Unknown'}
 
+    @timed('ip.lookup_many')
+    def lookup_many(self, ips) -> pd.DataFrame:
+        """
+        Looks up a whole batch of IP addresses with one vectorized search.
+
+        Args:
+            ips (list-like): IP address strings (or their integer values).
+
+        Returns:
+            pd.DataFrame: One row per input address, in input order, with the
+                          same organization, ip_type and country values that
+                          lookup_ip returns.
+        """
+        n = len(ips)
+        organization = np.full(n, 'Unknown', dtype=object)
+        ip_type = np.full(n, 'Unknown', dtype=object)
+        country = np.full(n, 'Unknown', dtype=object)
+
+        if self.range_starts is not None and len(self.range_starts) and n:
+            ip_ints, is_valid = parse_ips(ips, max_value=int(self.range_ends[-1]))
+            # Search in the index's own dtype so the index is never copied or cast
+            ip_ints = np.where(is_valid, ip_ints, 0).astype(self.range_starts.dtype)
+            i = np.searchsorted(self.range_starts, ip_ints, side='right') - 1
+            hit = is_valid & (i >= 0)
+            hit[hit] = ip_ints[hit] <= self.range_ends[i[hit]]
+            segments = i[hit]
+            orgs = self._segment_orgs[segments]
+            organization[hit] = self._org_names[orgs]
+            ip_type[hit] = self._org_ip_types[orgs]
+            country[hit] = self._country_names[self._segment_countries[segments]]
+
+        return pd.DataFrame({'organization': organization, 'ip_type': ip_type, 'country': country})
+
 # --- Part 2: Feature Engineering (IP + OS) ---
 
 def get_combined_features(ip_str: str, user_agent: str, ip_lookup: IPIntelligence) -> dict:
     """Extracts features from both IP (using the database) and User-Agent."""
+    cache = ip_lookup.features_cache
+    if cache is not None:
+        features = cache.get((ip_str, user_agent))
+        if features is not MISSING:
+            return dict(features)
+
     features = {}
     ip_info = ip_lookup.lookup_ip(ip_str)
     
@@ -102,43 +604,98 @@ def get_combined_features(ip_str: str, user_agent: str, ip_lookup: IPIntelligenc
     features['is_from_suspicious_country'] = 1 if ip_info['country'] in ['CN', 'RU', 'IR'] else 0
 
     # OS Features
-    ua_lower = user_agent.lower()
-    features['is_outdated_os'] = 1 if 'windows nt 6.1' in ua_lower else 0
-    features['is_headless'] = 1 if 'headless' in ua_lower or 'puppeteer' in ua_lower else 0
-    features['os_linux_server'] = 1 if 'linux' in ua_lower and 'android' not in ua_lower else 0
-    
+    features.update(extract_ua_features(user_agent))
+
+    if cache is not None:
+        cache.put((ip_str, user_agent), dict(features))
     return features
 
+def get_combined_features_batch(ips, user_agents, ip_lookup: IPIntelligence) -> pd.DataFrame:
+    """
+    Column-wise version of get_combined_features for many requests at once.
+
+    Returns:
+        pd.DataFrame: One row per (ip, user_agent) pair with the same feature
+                      columns, in the same order, as get_combined_features.
+    """
+    ip_info = ip_lookup.lookup_many(ips)
+    features = pd.DataFrame({
+        # IP Features
+        'ip_type_datacenter': (ip_info['ip_type'] == 'Data Center').astype(int),
+        'ip_type_residential': (ip_info['ip_type'] == 'Residential/Mobile').astype(int),
+        'is_from_suspicious_country': ip_info['country'].isin(['CN', 'RU', 'IR']).astype(int)
+    })
+    # OS Features, parsed once per distinct user agent
+    return pd.concat([features, extract_ua_features_bulk(user_agents)], axis=1)
+
 # --- Part 3: Model Training (Largely unchanged, now uses the more powerful features) ---
 
-def train_device_intelligence_model(ip_intelligence_db: IPIntelligence):
-    """Generates synthetic training data using the real IP database and trains a model."""
-    print("\nGenerating synthetic training data using the merged IP database...")
+def generate_device_training_data(ip_intelligence_db: IPIntelligence, n_rows: int = 2000, seed: int = 42,
+                                  ua_pool_size: int = 1000) -> pd.DataFrame:
+    """
+    Generates a labelled synthetic training set for the device model, drawing
+    every column as an array instead of building the rows one by one.
+
+    Suspicious rows get an address inside a randomly chosen range of the IP
+    database and one of the bot user agents; trusted rows get a private
+    address and a realistic user agent. The features are then computed for
+    all rows at once with get_combined_features_batch.
+
+    Args:
+        ip_intelligence_db (IPIntelligence): The loaded IP database.
+        n_rows (int): Number of samples to generate.
+        seed (int): Seed for every random draw, so the data is reproducible.
+        ua_pool_size (int): Number of distinct Faker user agents the trusted
+                            rows are drawn from.
+
+    Returns:
+        pd.DataFrame: The feature columns of get_combined_features plus the
+                      'is_suspicious' label.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, 2, size=n_rows)
+    suspicious = labels == 1
+    n_suspicious = int(suspicious.sum())
+    ip_ints = np.empty(n_rows, dtype=np.int64)
+    user_agents = np.empty(n_rows, dtype=object)
+
+    # Suspicious: an address inside a random range of the database
+    ip_db = ip_intelligence_db.ip_db
+    rows = rng.integers(0, len(ip_db), size=n_suspicious)
+    range_starts = ip_db['ip_start_int'].to_numpy(dtype=np.int64)[rows]
+    range_ends = ip_db['ip_end_int'].to_numpy(dtype=np.int64)[rows]
+    ip_ints[suspicious] = rng.integers(range_starts, range_ends, endpoint=True)
+    user_agents[suspicious] = np.array(BOT_USER_AGENTS, dtype=object)[rng.integers(0, len(BOT_USER_AGENTS), size=n_suspicious)]
+
+    # Trusted: a private address, uniform over all private networks like Faker's ipv4_private
+    sizes = np.array([network.num_addresses for network in PRIVATE_NETWORKS], dtype=np.int64)
+    bases = np.array([int(network.network_address) for network in PRIVATE_NETWORKS], dtype=np.int64)
+    ends = np.cumsum(sizes)
+    offsets = rng.integers(0, ends[-1], size=n_rows - n_suspicious)
+    networks = np.searchsorted(ends, offsets, side='right')
+    ip_ints[~suspicious] = bases[networks] + offsets - (ends - sizes)[networks]
+
+    # Faker is only needed to build training data, so it is imported here
+    from faker import Faker
     faker = Faker()
-    records = []
-    # Use the loaded database to generate more realistic training samples
-    known_ips_df = ip_intelligence_db.ip_db.sample(2000, replace=True)
+    faker.seed_instance(seed)
+    ua_pool = np.array([faker.user_agent() for _ in range(ua_pool_size)], dtype=object)
+    user_agents[~suspicious] = ua_pool[rng.integers(0, ua_pool_size, size=n_rows - n_suspicious)]
 
-    for _, row in known_ips_df.iterrows():
-        is_suspicious = random.choice([0, 1])
-        
-        if is_suspicious:
-            ip = str(ip_address(random.randint(row['ip_start_int'], row['ip_end_int'])))
-            ua = random.choice([
-                "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/45.0.2454.85 Safari/537.36",
-                "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HeadlessChrome/90.0.4430.212 Safari/537.36"
-            ])
-            label = 1
-        else:
-            ip = faker.ipv4_private()
-            ua = faker.user_agent()
-            label = 0
-
-        features = get_combined_features(ip, ua, ip_intelligence_db)
-        features['is_suspicious'] = label
-        records.append(features)
-        
-    df = pd.DataFrame(records)
+    df = get_combined_features_batch(ip_ints, user_agents, ip_intelligence_db)
+    df['is_suspicious'] = labels
+    return df
+
+def train_device_intelligence_model(ip_intelligence_db: IPIntelligence, n_rows: int = 2000, seed: int = 42):
+    """Generates synthetic training data using the real IP database and trains a model."""
+    # Training and plotting dependencies stay out of the scoring path's imports
+    from xgboost import XGBClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report, ConfusionMatrixDisplay
+    import matplotlib.pyplot as plt
+
+    print("\nGenerating synthetic training data using the merged IP database...")
+    df = generate_device_training_data(ip_intelligence_db, n_rows=n_rows, seed=seed)
     print("Synthetic data generated.")
 
     target = 'is_suspicious'
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from .anomaly_scoring import SCORE_DTYPE
+
+
+def _average_path_length(n_samples):
+    """Average path length of an unsuccessful BST search over n samples (as in sklearn)."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros(n_samples.shape)
+    result[n_samples == 2] = 1.0
+    big = n_samples > 2
+    result[big] = 2.0 * (np.log(n_samples[big] - 1.0) + np.euler_gamma) - 2.0 * (n_samples[big] - 1.0) / n_samples[big]
+    return result
+
+
+class FlatForest:
+    """
+    A trained Isolation Forest and its StandardScaler packed into flat NumPy
+    node arrays, with a vectorized evaluator that needs nothing but NumPy.
+
+    All trees live in one set of arrays. Leaves point back to themselves, so a
+    batch is scored with a level-synchronous traversal: every sample steps
+    down every tree at once, for as many levels as the deepest tree has.
+    Scores match IsolationForest.decision_function to floating-point rounding.
+    """
+    ARRAYS = ['scaler_mean', 'scaler_scale', 'feature', 'threshold', 'left', 'right',
+              'leaf_depth', 'roots', 'feature_names']
+
+    def __init__(self, scaler_mean, scaler_scale, feature, threshold, left, right, leaf_depth, roots,
+                 max_depth, denominator, offset, feature_names=None):
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_depth = leaf_depth
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.denominator = float(denominator)
+        self.offset = float(offset)
+        self.feature_names = feature_names
+
+    def _prepare(self, X) -> np.ndarray:
+        """Orders the columns, applies the scaler and casts like sklearn's trees do."""
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names is not None:
+                X = X[list(self.feature_names)]
+            X = X.to_numpy(dtype=np.float64)
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        return ((X - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+
+    def _depths(self, X) -> np.ndarray:
+        """Sums the isolation depth of every sample over all trees."""
+        n_samples = len(X)
+        rows = np.arange(n_samples)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_samples, len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.leaf_depth[nodes].sum(axis=1)
+
+    def score_samples(self, X, chunk_size: int = 4096) -> np.ndarray:
+        """Same as IsolationForest.score_samples on unscaled input."""
+        X = self._prepare(X)
+        depths = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            depths[start:start + chunk_size] = self._depths(X[start:start + chunk_size])
+        # For a single training sample depth and denominator are 0; like
+        # sklearn, the ratio is then taken as 1, which scores -0.5
+        ratio = np.divide(depths, self.denominator, out=np.ones(len(X)), where=self.denominator != 0)
+        return -(2 ** -ratio)
+
+    def decision_function(self, X) -> np.ndarray:
+        """Same as IsolationForest.decision_function on unscaled input. Negative is more anomalous."""
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X) -> np.ndarray:
+        """Returns 1 for normal samples and -1 for anomalies."""
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+    def score_batch(self, X) -> np.ndarray:
+        """Scores a batch and returns records of SCORE_DTYPE, like score_anomaly_batch."""
+        scores = self.decision_function(X)
+        results = np.empty(len(scores), dtype=SCORE_DTYPE)
+        results['score'] = scores
+        results['label'] = np.where(scores < 0, -1, 1)
+        return results
+
+    def save(self, path: str):
+        """Writes the packed forest to a single .npz file."""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS if getattr(self, name) is not None}
+        np.savez(path, max_depth=self.max_depth, denominator=self.denominator, offset=self.offset, **arrays)
+
+    @classmethod
+    def load(cls, path: str):
+        """Reads a packed forest written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            kwargs = {name: data[name] for name in cls.ARRAYS if name in data.files}
+            return cls(max_depth=data['max_depth'], denominator=data['denominator'],
+                       offset=data['offset'], **kwargs)
+
+
+def export_flat_forest(model, scaler) -> FlatForest:
+    """
+    Flattens a fitted IsolationForest and the StandardScaler it was trained
+    behind into a FlatForest.
+
+    Args:
+        model: A fitted sklearn IsolationForest.
+        scaler: The fitted StandardScaler applied before the model.
+
+    Returns:
+        FlatForest: The packed forest, ready to score raw (unscaled) features.
+    """
+    n_features = model.n_features_in_
+    scaler_mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scaler_scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+
+    features, thresholds, lefts, rights, leaf_depths, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for estimator, tree_features in zip(model.estimators_, model.estimators_features_):
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves keep pointing at themselves, so extra levels are no-ops
+        feature = np.where(is_leaf, 0, np.asarray(tree_features)[np.maximum(tree.feature, 0)])
+        threshold = np.where(is_leaf, np.inf, tree.threshold)
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+        # Isolation depth credited at each leaf, computed exactly as sklearn does
+        node_depths = tree.compute_node_depths()
+        leaf_depth = node_depths + _average_path_length(tree.n_node_samples) - 1.0
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        leaf_depths.append(leaf_depth)
+        roots.append(offset)
+        max_depth = max(max_depth, int(node_depths.max()) - 1)
+        offset += tree.node_count
+
+    denominator = len(model.estimators_) * _average_path_length([model.max_samples_])[0]
+    feature_names = getattr(scaler, 'feature_names_in_', None)
+
+    return FlatForest(
+        scaler_mean=np.asarray(scaler_mean, dtype=np.float64),
+        scaler_scale=np.asarray(scaler_scale, dtype=np.float64),
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        leaf_depth=np.concatenate(leaf_depths),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+        denominator=denominator,
+        offset=model.offset_,
+        feature_names=np.asarray(feature_names, dtype=str) if feature_names is not None else None
+    )
+
+
+if __name__ == '__main__':
+    # Export the trained keystroke and mouse detectors next to their .pkl files
+    import time
+    from .model_registry import get_model_pair
+
+    for name, path in [('keyboard', 'models/anomaly_detection_model.flat.npz'),
+                       ('mouse', 'models/mouse_anomaly_model.flat.npz')]:
+        try:
+            model, scaler = get_model_pair(f'{name}_model')
+        except FileNotFoundError:
+            print(f"Skipping the {name} model: its .pkl files have not been trained yet.")
+            continue
+
+        flat = export_flat_forest(model, scaler)
+        flat.save(path)
+        print(f"Exported the {name} model to '{path}' ({flat.feature.size} nodes, depth {flat.max_depth}).")
+
+        # Check against sklearn on random inputs around the training distribution
+        rng = np.random.default_rng(0)
+        sample = flat.scaler_mean + rng.normal(size=(1000, len(flat.scaler_mean))) * flat.scaler_scale * 2
+        expected = model.decision_function(scaler.transform(sample))
+        max_error = np.abs(flat.decision_function(sample) - expected).max()
+        start = time.perf_counter()
+        for row in sample[:200]:
+            flat.decision_function(row)
+        single_ms = (time.perf_counter() - start) / 200 * 1000
+        print(f"  max |score difference| vs sklearn: {max_error:.2e}, single-sample latency: {single_ms:.3f} ms")
@@ -0,0 +1,230 @@
+import functools
+import math
+import os
+import re
+import threading
+import time
+
+# Linear sub-buckets per power of two: latencies are kept to within ~3%
+SUB_BUCKETS = 32
+# Bucket groups kept; values up to 2**45 ns (about 10 hours) are told apart
+MAX_EXPONENT = 42
+_SUB_BITS = SUB_BUCKETS.bit_length() - 1
+_N_BUCKETS = MAX_EXPONENT * SUB_BUCKETS
+# Quantiles reported by snapshot() and prometheus_text()
+QUANTILES = [0.5, 0.9, 0.99]
+
+# Set MODEL_METRICS=1 in the environment to record from process start
+_enabled = os.getenv('MODEL_METRICS', '') not in ('', '0', 'false', 'False')
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """
+    An HDR-style latency histogram: log-linear buckets with SUB_BUCKETS
+    linear steps per power of two, so memory is fixed and every recorded
+    value is known to within a few percent at any magnitude.
+    """
+    def __init__(self):
+        self.counts = [0] * _N_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(value_ns: int) -> int:
+        """Bucket index of a value: exact below SUB_BUCKETS, log-linear above."""
+        if value_ns < SUB_BUCKETS:
+            return max(value_ns, 0)
+        exponent = value_ns.bit_length() - 1
+        # The bits right below the leading one pick the linear sub-bucket
+        shift = exponent - _SUB_BITS
+        index = (shift + 1) * SUB_BUCKETS + (value_ns >> shift) - SUB_BUCKETS
+        return min(index, _N_BUCKETS - 1)
+
+    @staticmethod
+    def _bucket_upper_ns(index: int) -> int:
+        """Largest value (in ns) that falls into a bucket."""
+        if index < SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value_ns: int):
+        index = self._bucket(value_ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ns += value_ns
+            self.max_ns = max(self.max_ns, value_ns)
+            self.min_ns = value_ns if self.min_ns is None else min(self.min_ns, value_ns)
+
+    def percentile(self, q: float) -> float:
+        """The latency in seconds below which a fraction `q` of the recorded values lie."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(math.ceil(q * self.count), 1)
+            seen = 0
+            for index, n in enumerate(self.counts):
+                seen += n
+                if seen >= rank:
+                    return min(self._bucket_upper_ns(index), self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    def summary(self) -> dict:
+        result = {
+            'count': self.count,
+            'sum_s': self.total_ns / 1e9,
+            'mean_s': self.total_ns / self.count / 1e9 if self.count else 0.0,
+            'min_s': (self.min_ns or 0) / 1e9,
+            'max_s': self.max_ns / 1e9
+        }
+        for q in QUANTILES:
+            result[f"p{q * 100:g}_s"] = self.percentile(q)
+        return result
+
+
+class _Timer:
+    """Times one block into a stage's histogram; counts '<stage>.errors' on exceptions."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter_ns() - self.start)
+        if exc_type is not None:
+            increment(f"{self.name}.errors")
+        return False
+
+
+class _NullTimer:
+    """Shared do-nothing timer handed out while instrumentation is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable():
+    """Starts recording timings and counters."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stops recording; timers and counters become no-ops."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _histogram(name: str) -> LatencyHistogram:
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(name, LatencyHistogram())
+    return histogram
+
+
+def record(name: str, value_ns: int):
+    """Adds one latency (in nanoseconds) to a stage's histogram."""
+    if _enabled:
+        _histogram(name).record(value_ns)
+
+
+def increment(name: str, n: int = 1):
+    """Adds `n` to a named counter."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def timer(name: str):
+    """
+    Context manager that records how long its block took under stage `name`:
+
+        with timer('mouse.extract_features'):
+            ...
+    """
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name: str):
+    """Decorator that records every call of a function under stage `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """Forgets every recorded timing and counter."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot() -> dict:
+    """
+    Returns everything recorded so far as a plain dict.
+
+    Returns:
+        dict: {'stages': {stage: {count, sum_s, mean_s, min_s, max_s, p50_s,
+              p90_s, p99_s}}, 'counters': {name: value}}
+    """
+    with _lock:
+        histograms = dict(_histograms)
+        counters = dict(_counters)
+    return {
+        'stages': {name: histograms[name].summary() for name in sorted(histograms)},
+        'counters': dict(sorted(counters.items()))
+    }
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def prometheus_text(prefix: str = 'fraud') -> str:
+    """
+    Renders snapshot() in the Prometheus text exposition format: one summary
+    of stage latencies (labelled by stage and quantile) and one counter per
+    named counter.
+    """
+    data = snapshot()
+    metric = f"{prefix}_stage_latency_seconds"
+    lines = [f"# HELP {metric} Latency of instrumented stages.", f"# TYPE {metric} summary"]
+    for stage, summary in data['stages'].items():
+        for q in QUANTILES:
+            lines.append(f'{metric}{{stage="{stage}",quantile="{q:g}"}} {summary[f"p{q * 100:g}_s"]:.9g}')
+        lines.append(f'{metric}_sum{{stage="{stage}"}} {summary["sum_s"]:.9g}')
+        lines.append(f'{metric}_count{{stage="{stage}"}} {summary["count"]}')
+    for name, value in data['counters'].items():
+        counter = f"{prefix}_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {counter} counter")
+        lines.append(f"{counter} {value}")
+    return "\n".join(lines) + "\n"
@@ -4,6 +4,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import IsolationForest
 import joblib
 import warnings
+from .columnar_store import is_columnar, iter_keystroke_batches, keystroke_feature_columns, read_keystrokes
 
 warnings.filterwarnings('ignore')
 
@@ -12,14 +13,19 @@ def train_anomaly_model(csv_filename: str):
     Trains an Isolation Forest model on the keystroke data to detect anomalies.
 
     Args:
-        csv_filename (str): The path to the CSV file with normal human keystroke data.
+        csv_filename (str): The path to the CSV file with normal human keystroke data,
+                            or to its Parquet conversion (see columnar_store.py).
     """
     # --- 1. Load the Data ---
     print(f"Loading data from '{csv_filename}'...")
     try:
-        df = pd.read_csv(csv_filename)
-        # We only need the timing features for this model
-        features_df = df.drop(['subject', 'sessionIndex', 'rep'], axis=1)
+        if is_columnar(csv_filename):
+            # Only the timing columns are read from the Parquet file
+            features_df = read_keystrokes(csv_filename, columns=keystroke_feature_columns(csv_filename))
+        else:
+            df = pd.read_csv(csv_filename)
+            # We only need the timing features for this model
+            features_df = df.drop(['subject', 'sessionIndex', 'rep'], axis=1)
     except FileNotFoundError:
         print(f"Error: The file '{csv_filename}' was not found.")
         return
@@ -49,6 +55,87 @@ def train_anomaly_model(csv_filename: str):
     print("You can now use these to detect non-human typing patterns.")
 
 
+def train_anomaly_model_streaming(csv_filename: str, chunksize: int = 100_000,
+                                  reservoir_size: int = 100_000, random_state: int = 42):
+    """
+    Trains the same keystroke anomaly model as train_anomaly_model without
+    loading the whole CSV into memory.
+
+    The CSV is read in chunks of float32 timing columns. The scaler is fitted
+    incrementally with partial_fit, and a uniform random sample of the rows is
+    kept with reservoir sampling; the Isolation Forest only draws max_samples
+    rows per tree anyway, so it is trained on that reservoir. Peak memory is
+    bounded by the chunk and reservoir sizes, not by the dataset size.
+
+    Args:
+        csv_filename (str): The path to the CSV file with normal human keystroke data,
+                            or to its Parquet conversion (see columnar_store.py).
+        chunksize (int): Number of rows read at a time.
+        reservoir_size (int): Number of rows kept for fitting the forest.
+        random_state (int): Seed for the reservoir and the forest.
+    """
+    # --- 1. Inspect the Columns ---
+    print(f"Streaming data from '{csv_filename}' in chunks of {chunksize} rows...")
+    try:
+        # We only need the timing features for this model
+        feature_columns = keystroke_feature_columns(csv_filename)
+    except FileNotFoundError:
+        print(f"Error: The file '{csv_filename}' was not found.")
+        return
+
+    # --- 2. Fit the Scaler and Fill the Reservoir, One Chunk at a Time ---
+    scaler = StandardScaler()
+    rng = np.random.default_rng(random_state)
+    reservoir = np.empty((reservoir_size, len(feature_columns)), dtype=np.float32)
+    rows_seen = 0
+
+    if is_columnar(csv_filename):
+        chunks = iter_keystroke_batches(csv_filename, feature_columns, batch_size=chunksize)
+    else:
+        chunks = pd.read_csv(
+            csv_filename,
+            usecols=feature_columns,
+            dtype={col: np.float32 for col in feature_columns},
+            chunksize=chunksize
+        )
+    for chunk in chunks:
+        chunk = chunk[feature_columns].astype(np.float32)
+        scaler.partial_fit(chunk)
+        values = chunk.to_numpy()
+
+        # Reservoir sampling (Algorithm R): the first rows fill the reservoir,
+        # then row i replaces a random slot with probability reservoir_size / (i + 1)
+        positions = np.arange(rows_seen, rows_seen + len(values))
+        fill = positions < reservoir_size
+        reservoir[positions[fill]] = values[fill]
+        slots = rng.integers(0, positions[~fill] + 1)
+        keep = slots < reservoir_size
+        slots, replacements = slots[keep][::-1], values[~fill][keep][::-1]
+        # Only the last row drawn for a slot survives, as in the sequential algorithm.
+        # NumPy does not define which write wins for repeated indices, so keep
+        # just the first occurrence of each slot in reversed order
+        slots, last = np.unique(slots, return_index=True)
+        reservoir[slots] = replacements[last]
+        rows_seen += len(values)
+
+    if rows_seen == 0:
+        print("Error: The file contains no keystroke samples.")
+        return
+    sample = pd.DataFrame(reservoir[:min(rows_seen, reservoir_size)], columns=feature_columns)
+    print(f"Scaler fitted on {rows_seen} rows; {len(sample)} rows kept for the forest.")
+
+    # --- 3. Train the Isolation Forest Model on the Reservoir ---
+    print("\nTraining the Anomaly Detection model (Isolation Forest)...")
+    anomaly_model = IsolationForest(contamination='auto', random_state=random_state, n_jobs=-1)
+    anomaly_model.fit(scaler.transform(sample))
+    print("Model training complete.")
+
+    # --- 4. Save the Model and Scaler ---
+    joblib.dump(anomaly_model, 'models/anomaly_detection_model.pkl')
+    joblib.dump(scaler, 'models/anomaly_scaler.pkl')
+    print("\nAnomaly detection model and its scaler have been saved to .pkl files.")
+
+
 def test_anomaly_predictions(csv_filename: str):
     """
     Loads the trained anomaly model and tests it on a normal sample and a
@@ -1,46 +1,61 @@
 import pandas as pd
-import joblib
+from .model_registry import get_model_pair
+from .anomaly_scoring import score_anomaly_batch
 import numpy as np
 import warnings
 
 warnings.filterwarnings('ignore')
 
+def score_keystrokes(batch) -> np.ndarray:
+    """
+    Scores a batch of keystroke timing samples with the keystroke anomaly model.
+
+    Args:
+        batch (pd.DataFrame or np.ndarray): N rows of keystroke timing features
+                                            (the keyboard_data.csv columns without
+                                            subject, sessionIndex and rep).
+
+    Returns:
+        np.ndarray: N records with a 'label' field (1 = normal, -1 = anomaly) and
+                    a 'score' field (negative scores are more anomalous).
+
+    Raises:
+        FileNotFoundError: If the model has not been trained yet.
+    """
+    # The model and scaler are loaded once per process, and reloaded together, by the registry
+    model, scaler = get_model_pair('keyboard_model')
+    return score_anomaly_batch(model, scaler, batch, stage='keyboard')
+
+
 def check_typing_pattern(sample_data: pd.DataFrame):
     """
-    Loads the trained anomaly detection model and predicts whether a given
-    typing sample is normal (human) or an anomaly (potential bot).
+    Predicts whether a given typing sample is normal (human) or an anomaly
+    (potential bot) and prints the result.
 
     Args:
         sample_data (pd.DataFrame): A DataFrame with a single row of keystroke data.
+
+    Returns:
+        np.ndarray: The record returned by score_keystrokes, or None on error.
     """
     try:
-        # Load the trained model and its specific scaler
-        model = joblib.load('models/anomaly_detection_model.pkl')
-        scaler = joblib.load('models/anomaly_scaler.pkl')
+        result = score_keystrokes(sample_data)[0]
     except FileNotFoundError:
         print("Error: Could not find the required .pkl files.")
         print("Please run the 'train_anomaly_detector.py' script first to generate the model files.")
         return
 
-    # --- 1. Prepare and Scale the Data ---
-    # Apply the same scaling transformation used during training
-    sample_scaled = scaler.transform(sample_data)
-
-    # --- 2. Make the Prediction ---
-    prediction = model.predict(sample_scaled)
-    # The 'decision_function' gives a score. Negative values are more likely to be anomalies.
-    anomaly_score = model.decision_function(sample_scaled)
-
-    # --- 3. Interpret and Display the Result ---
+    # --- Interpret and Display the Result ---
     print("\n--- Anomaly Detection Result ---")
-    print(f"Anomaly Score: {anomaly_score[0]:.4f} (Negative scores are more anomalous)")
+    print(f"Anomaly Score: {result['score']:.4f} (Negative scores are more anomalous)")
     
-    if prediction[0] == 1:
+    if result['label'] == 1:
         print("Prediction: NORMAL Pattern")
         print("Interpretation: The typing behavior is consistent with a human user.")
     else:
         print("Prediction: ANOMALY DETECTED")
         print("Interpretation: The typing behavior is suspicious and could be a bot.")
+    return result
 
 
 if __name__ == '__main__':
@@ -1,11 +1,15 @@
-import boto3
-from dotenv import load_dotenv
 import os
 import io
-from PIL import Image
-import requests
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import numpy as np
+from .lru_cache import LRUCache, MISSING
+from .instrumentation import timer
 
-load_dotenv()
+# boto3, requests, Pillow and python-dotenv are imported on first use, so
+# importing this module for the scoring path stays cheap
 
 # --- DEMO IMAGES ---
 # In a real application, you would get these image files from a web request.
@@ -15,36 +19,101 @@ LIVE_SELFIE_IMAGE_URL = "https://placehold.co/400x400/D62828/FFFFFF?text=Live+Se
 # An image of a different person for testing failed matches
 DIFFERENT_PERSON_IMAGE_URL = "https://placehold.co/400x400/F77F00/FFFFFF?text=Different+Person"
 
+# --- Connection Settings ---
+# Concurrent Rekognition calls share one client; its connection pool should be
+# at least as large as the number of verification workers.
+MAX_WORKERS = 16
+# botocore Config options of the shared client
+REKOGNITION_CONFIG = {
+    'connect_timeout': 3,
+    'read_timeout': 10,
+    'max_pool_connections': MAX_WORKERS,
+    'retries': {'max_attempts': 2, 'mode': 'standard'}
+}
+# Seconds allowed to connect to and read from an image host
+DOWNLOAD_TIMEOUT = (3.05, 10)
+
+# --- Image Preprocessing ---
+# Faces stay well above Rekognition's minimum size at this resolution, while
+# phone photos shrink from several megabytes to a few hundred kilobytes.
+MAX_IMAGE_EDGE = 1280
+JPEG_QUALITY = 90
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION = 0x0112
+
+_client = None
+_client_lock = threading.Lock()
+_http_session = None
+
+
+class FaceNotDetectedError(Exception):
+    """Raised by a comparer when no face can be found in one of the images."""
+
 
 def get_rekognition_client():
     """
-    Initializes and returns the boto3 client for AWS Rekognition,
-    using credentials from the .env file.
+    Returns the process-wide boto3 client for AWS Rekognition, creating it
+    on first use with credentials from the .env file. boto3 clients are
+    thread-safe, so every verification shares its credentials and pool.
     """
-    try:
-        aws_access_key = os.getenv("AZURE_FACE_KEY")
-        aws_secret_key = os.getenv("AZURE_FACE_ENDPOINT")
-        aws_region = os.getenv("AZURE_FACE_REGION")
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is not None:
+            return _client
+        try:
+            import boto3
+            from botocore.config import Config
+            from dotenv import load_dotenv
 
-        if not all([aws_access_key, aws_secret_key, aws_region]):
-            print("Error: AWS credentials or region not found in .env file.")
+            load_dotenv()
+            aws_access_key = os.getenv("AZURE_FACE_KEY")
+            aws_secret_key = os.getenv("AZURE_FACE_ENDPOINT")
+            aws_region = os.getenv("AZURE_FACE_REGION")
+
+            if not all([aws_access_key, aws_secret_key, aws_region]):
+                print("Error: AWS credentials or region not found in .env file.")
+                return None
+
+            _client = boto3.client(
+                'rekognition',
+                aws_access_key_id=aws_access_key,
+                aws_secret_access_key=aws_secret_key,
+                region_name=aws_region,
+                config=Config(**REKOGNITION_CONFIG)
+            )
+            return _client
+        except Exception as e:
+            print(f"Error creating Rekognition client: {e}")
             return None
 
-        return boto3.client(
-            'rekognition',
-            aws_access_key_id=aws_access_key,
-            aws_secret_access_key=aws_secret_key,
-            region_name=aws_region
-        )
-    except Exception as e:
-        print(f"Error creating Rekognition client: {e}")
-        return None
+
+def _get_http_session():
+    """Returns the process-wide requests.Session used for image downloads."""
+    global _http_session
+    if _http_session is not None:
+        return _http_session
+
+    with _client_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS))
+            session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS))
+            _http_session = session
+    return _http_session
 
 
-def get_image_bytes_from_url(url):
-    """Downloads an image from a URL and returns its byte content."""
+def get_image_bytes_from_url(url, timeout=DOWNLOAD_TIMEOUT):
+    """Downloads an image from a URL over the shared HTTP session and returns its byte content."""
+    import requests
+
     try:
-        response = requests.get(url)
+        response = _get_http_session().get(url, timeout=timeout)
         response.raise_for_status()  # Raises an error for bad responses (4xx or 5xx)
         return response.content
     except requests.exceptions.RequestException as e:
@@ -52,7 +121,118 @@ def get_image_bytes_from_url(url):
         return None
 
 
-def verify_facial_identity(source_image_bytes, target_image_bytes, similarity_threshold=99.0):
+class ImagePreprocessor:
+    """
+    Normalizes images before they are sent for comparison: decodes once,
+    applies the EXIF orientation, downsizes to `max_edge` and re-encodes as
+    JPEG. Results are cached by the SHA-256 of the input, so an ID card that
+    is submitted on every attempt is only processed once.
+    """
+    def __init__(self, max_edge: int = MAX_IMAGE_EDGE, quality: int = JPEG_QUALITY, cache_size: int = 256):
+        """
+        Args:
+            max_edge (int): Longest edge, in pixels, of the images sent on.
+            quality (int): JPEG quality of the re-encoded images.
+            cache_size (int): Number of processed images remembered.
+        """
+        self.max_edge = max_edge
+        self.quality = quality
+        self.cache = LRUCache(max_size=cache_size) if cache_size else None
+
+    def prepare(self, image_bytes: bytes) -> bytes:
+        """Returns the normalized JPEG bytes of an image (cached by content hash)."""
+        if not image_bytes or self.cache is None:
+            return self._process(image_bytes)
+
+        key = hashlib.sha256(image_bytes).digest()
+        prepared = self.cache.get(key)
+        if prepared is MISSING:
+            prepared = self._process(image_bytes)
+            self.cache.put(key, prepared)
+        return prepared
+
+    def _process(self, image_bytes: bytes) -> bytes:
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            # Opening only reads the header; small, upright JPEGs are sent as they are
+            if (image.format == 'JPEG' and max(image.size) <= self.max_edge
+                    and image.getexif().get(EXIF_ORIENTATION, 1) == 1):
+                return image_bytes
+
+            # Let the JPEG decoder scale down by up to 8x while decoding, which
+            # is far cheaper than decoding at full size and resizing afterwards
+            image.draft('RGB', (self.max_edge, self.max_edge))
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=self.quality)
+            return output.getvalue()
+        except (UnidentifiedImageError, OSError):
+            # Not an image Pillow can read; let the comparer report it
+            return image_bytes
+
+
+# The preprocessor used by verify_facial_identity
+default_preprocessor = ImagePreprocessor()
+
+
+# --- Face Comparers ---
+# A comparer takes two images and returns a response shaped like Rekognition's
+# compare_faces ('FaceMatches' and 'UnmatchedFaces' lists).
+
+class RekognitionComparer:
+    """Compares faces with Amazon Rekognition through the shared client."""
+    def __init__(self, client=None):
+        self.client = client if client is not None else get_rekognition_client()
+        if self.client is None:
+            raise RuntimeError("Could not initialize Rekognition client.")
+
+    def compare(self, source_image_bytes, target_image_bytes, similarity_threshold):
+        try:
+            return self.client.compare_faces(
+                SourceImage={'Bytes': source_image_bytes},
+                TargetImage={'Bytes': target_image_bytes},
+                SimilarityThreshold=similarity_threshold
+            )
+        except self.client.exceptions.InvalidParameterException as e:
+            raise FaceNotDetectedError(str(e)) from e
+
+
+class FakeFaceComparer:
+    """
+    A local stand-in for Rekognition, for offline benchmarks and demos.
+
+    Identical images match with 100% similarity; anything else does not.
+    Each call sleeps for `latency` seconds plus up to `jitter` seconds, plus
+    the upload time of both images if `bytes_per_second` is set, which mimics
+    a network-bound API without using any CPU.
+    """
+    def __init__(self, latency: float = 0.2, jitter: float = 0.05, seed: int = 0, bytes_per_second: float = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bytes_per_second = bytes_per_second
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def compare(self, source_image_bytes, target_image_bytes, similarity_threshold):
+        with self._lock:
+            delay = self.latency + self.jitter * self._rng.random()
+        if self.bytes_per_second:
+            delay += (len(source_image_bytes or b'') + len(target_image_bytes or b'')) / self.bytes_per_second
+        time.sleep(delay)
+        if not source_image_bytes or not target_image_bytes:
+            raise FaceNotDetectedError("Empty image.")
+        if source_image_bytes == target_image_bytes:
+            return {'FaceMatches': [{'Similarity': 100.0}], 'UnmatchedFaces': []}
+        return {'FaceMatches': [], 'UnmatchedFaces': [{}]}
+
+
+def verify_facial_identity(source_image_bytes, target_image_bytes, similarity_threshold=99.0, comparer=None,
+                           preprocess=True):
     """
     Compares two faces using Amazon Rekognition for identity verification.
 
@@ -60,20 +240,30 @@ def verify_facial_identity(source_image_bytes, target_image_bytes, similarity_th
         source_image_bytes (bytes): The byte content of the source image (e.g., photo ID).
         target_image_bytes (bytes): The byte content of the target image (e.g., live selfie).
         similarity_threshold (float): The minimum confidence score to be considered a match (99.0 is recommended by AWS).
+        comparer: Object with a compare() method. Defaults to a RekognitionComparer on the shared client.
+        preprocess (bool): Downsize and re-encode both images with default_preprocessor first.
 
     Returns:
         A dictionary containing the verification result.
     """
-    rekognition_client = get_rekognition_client()
-    if not rekognition_client:
-        return {"error": "Could not initialize Rekognition client."}
+    if comparer is None:
+        try:
+            comparer = RekognitionComparer()
+        except RuntimeError:
+            return {"error": "Could not initialize Rekognition client."}
+
+    if preprocess:
+        try:
+            with timer('face.preprocess'):
+                source_image_bytes = default_preprocessor.prepare(source_image_bytes)
+                target_image_bytes = default_preprocessor.prepare(target_image_bytes)
+        except Exception as e:
+            # e.g. PIL's DecompressionBombError for an absurdly large image
+            return {"error": True, "message": f"The images could not be processed: {e}"}
 
     try:
-        response = rekognition_client.compare_faces(
-            SourceImage={'Bytes': source_image_bytes},
-            TargetImage={'Bytes': target_image_bytes},
-            SimilarityThreshold=similarity_threshold
-        )
+        with timer('face.compare_faces'):
+            response = comparer.compare(source_image_bytes, target_image_bytes, similarity_threshold)
 
         if response['FaceMatches']:
             similarity = response['FaceMatches'][0]['Similarity']
@@ -83,26 +273,103 @@ def verify_facial_identity(source_image_bytes, target_image_bytes, similarity_th
                 "message": "Identity VERIFIED. The faces are a confident match."
             }
         else:
-            # This part runs if no faces match with at least 99% confidence.
-            # We can check the un-matched faces to see the highest similarity found.
-            max_similarity = 0
-            if response.get('UnmatchedFaces'):
-                # This key may not exist if no faces were found at all
-                # We check similarity of the target face if it was detected
-                 pass # In a real app you might log this
-            
+            # No faces matched with at least the threshold confidence
             return {
                 "match": False,
                 "confidence": f"< {similarity_threshold}%",
                 "message": "Identity FAILED. The faces do not match."
             }
-            
-    except rekognition_client.exceptions.InvalidParameterException:
+
+    except FaceNotDetectedError:
         return {"error": True, "message": "No face could be detected in one or both of the images."}
     except Exception as e:
         return {"error": True, "message": f"An AWS Rekognition API error occurred: {e}"}
 
 
+class FaceVerificationService:
+    """
+    Runs many face verifications concurrently over one comparer (and so one
+    Rekognition client and connection pool), through a bounded worker pool.
+
+    The timeout of a comparison starts when a worker picks it up, so pairs
+    queued behind other callers' work are not failed for waiting. It only
+    limits how long verify_many waits: a comparison that runs past it keeps
+    its worker until the comparer returns, and later pairs queue behind it.
+    The default comparer bounds every call with the connect/read timeouts
+    and retries in REKOGNITION_CONFIG, which is what bounds the wait for a
+    free worker; a custom comparer must bound its own calls.
+    """
+    def __init__(self, comparer=None, max_workers: int = MAX_WORKERS, timeout: float = 15.0,
+                 similarity_threshold: float = 99.0, preprocess: bool = True):
+        """
+        Args:
+            comparer: Object with a compare() method. Defaults to a RekognitionComparer.
+            max_workers (int): Maximum number of comparisons in flight.
+            timeout (float): Seconds allowed per comparison, counted from when
+                             it starts running.
+            similarity_threshold (float): Passed to verify_facial_identity.
+            preprocess (bool): Passed to verify_facial_identity.
+        """
+        self.comparer = comparer if comparer is not None else RekognitionComparer()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.similarity_threshold = similarity_threshold
+        self.preprocess = preprocess
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='face-verify')
+
+    def verify(self, source_image_bytes, target_image_bytes) -> dict:
+        """Verifies one pair of images."""
+        return self.verify_many([(source_image_bytes, target_image_bytes)])[0]
+
+    def verify_many(self, pairs) -> list:
+        """
+        Verifies many (source_image_bytes, target_image_bytes) pairs at once.
+
+        Args:
+            pairs (list): The image pairs to compare.
+
+        Returns:
+            list: One verify_facial_identity result per pair, in input order.
+                  A comparison that runs past its timeout, or fails in any
+                  other way, gets an error result; the other pairs are unaffected.
+        """
+        started = [threading.Event() for _ in pairs]
+        start_times = [None] * len(pairs)
+
+        def run(i, source, target):
+            start_times[i] = time.monotonic()
+            started[i].set()
+            return verify_facial_identity(source, target, self.similarity_threshold, self.comparer, self.preprocess)
+
+        futures = [self._executor.submit(run, i, source, target) for i, (source, target) in enumerate(pairs)]
+
+        results = []
+        for i, future in enumerate(futures):
+            # The pool is shared with other callers, so a pair may wait for a
+            # free worker first; its own timeout starts once it runs
+            while not started[i].wait(timeout=self.timeout) and not future.done():
+                pass
+            deadline = (start_times[i] or time.monotonic()) + self.timeout
+            try:
+                results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+            except FutureTimeoutError:
+                future.cancel()
+                results.append({"error": True, "message": "Face verification timed out."})
+            except Exception as e:
+                results.append({"error": True, "message": f"Face verification failed: {e}"})
+        return results
+
+    def close(self):
+        """Stops the worker pool once in-flight comparisons are done."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 # --- Main Execution Block ---
 if __name__ == "__main__":
     print("--- Running Backend Facial Verification Service ---")
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by LRUCache.get when a key is absent or expired
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe, bounded least-recently-used cache with an optional
+    time-to-live, plus hit/miss/eviction counters that can be exported.
+    """
+    def __init__(self, max_size: int = 10000, ttl: float = None, clock=time.monotonic):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept; the least recently
+                            used entry is evicted beyond this.
+            ttl (float): Seconds an entry stays valid after it is stored, or
+                         None to keep entries until they are evicted.
+            clock (callable): Monotonic time source, replaceable for testing.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive number of entries.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        """Returns the cached value for `key`, or `default` if it is absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores `value` under `key`, evicting the least recently used entry if full."""
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry, e.g. after the underlying data has been reloaded."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Returns the cache counters as a plain dict, ready to be exported."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+import joblib
+from .instrumentation import timer
+
+# Every pickled artifact the scoring scripts need, by registry name.
+# Paths are relative to the repository root, like everywhere else in models/.
+MODEL_PATHS = {
+    'keyboard_model': 'models/anomaly_detection_model.pkl',
+    'keyboard_scaler': 'models/anomaly_scaler.pkl',
+    'mouse_model': 'models/mouse_anomaly_model.pkl',
+    'mouse_scaler': 'models/mouse_scaler.pkl',
+    'device_model': 'models/device_intelligence_model.pkl'
+}
+
+# Models that must always be served together with the scaler they were trained on
+MODEL_PAIRS = {
+    'keyboard_model': 'keyboard_scaler',
+    'mouse_model': 'mouse_scaler'
+}
+
+
+class ModelRegistry:
+    """
+    Loads each pickled model once per process and hands out the same object
+    on every request, so per-request latency is pure inference.
+
+    A model is reloaded automatically when its file's modification time
+    changes (checked at most once per `check_interval` seconds). With
+    `mmap_mode='r'`, the NumPy arrays inside the pickle are memory-mapped
+    rather than copied, so forked workers can share those pages.
+
+    A model and its scaler should be fetched with get_pair(), which reloads
+    both together and swaps them as one tuple, so a caller never gets a new
+    forest with an old scaler or the other way round.
+    """
+    def __init__(self, paths: dict = None, mmap_mode: str = None, check_interval: float = 1.0):
+        """
+        Args:
+            paths (dict): Registry name -> .pkl path. Defaults to MODEL_PATHS.
+            mmap_mode (str): Passed to joblib.load, e.g. 'r'. None loads into memory.
+            check_interval (float): Minimum seconds between mtime checks of one file.
+        """
+        self.paths = dict(MODEL_PATHS if paths is None else paths)
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._entries = {}  # name -> (model, mtime_ns, last_checked)
+        self._pairs = {}  # (model name, scaler name) -> (model, scaler, mtimes_ns, last_checked)
+        self._lock = threading.Lock()
+
+    def get(self, name: str):
+        """
+        Returns the loaded model registered as `name`, loading or hot-reloading
+        it if needed. Raises FileNotFoundError if the file does not exist yet.
+        """
+        entry = self._entries.get(name)
+        now = time.monotonic()
+        if entry is not None and now - entry[2] < self.check_interval:
+            return entry[0]
+
+        with self._lock:
+            entry = self._entries.get(name)
+            path = self.paths[name]
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                if entry is None:
+                    raise
+                # The file is being replaced; keep serving the model we have
+                return entry[0]
+
+            if entry is not None and entry[1] == mtime_ns:
+                self._entries[name] = (entry[0], mtime_ns, now)
+                return entry[0]
+
+            try:
+                model = self._load(path)
+            except FileNotFoundError:
+                if entry is None:
+                    raise
+                return entry[0]
+            except Exception as e:
+                if entry is None:
+                    raise
+                print(f"Warning: could not reload '{path}', keeping the previous version: {e}")
+                return entry[0]
+
+            if entry is not None:
+                print(f"Reloaded '{name}' from '{path}'.")
+            self._entries[name] = (model, mtime_ns, now)
+            return model
+
+    def get_pair(self, model_name: str, scaler_name: str = None) -> tuple:
+        """
+        Returns (model, scaler) for a model and the scaler it was trained on,
+        loading or hot-reloading them if needed. When either file changes,
+        both are re-read and replaced in one step; if either cannot be read,
+        the previous pair keeps being served.
+
+        Args:
+            model_name (str): Registry name of the model.
+            scaler_name (str): Registry name of its scaler. Defaults to the
+                               one listed in MODEL_PAIRS.
+
+        Raises:
+            FileNotFoundError: If either file does not exist yet.
+        """
+        key = (model_name, scaler_name or MODEL_PAIRS[model_name])
+        entry = self._pairs.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry[3] < self.check_interval:
+            return entry[0], entry[1]
+
+        with self._lock:
+            entry = self._pairs.get(key)
+            paths = [self.paths[name] for name in key]
+            try:
+                mtimes_ns = tuple(os.stat(path).st_mtime_ns for path in paths)
+            except FileNotFoundError:
+                if entry is None:
+                    raise
+                return entry[0], entry[1]
+
+            if entry is not None and entry[2] == mtimes_ns:
+                self._pairs[key] = (entry[0], entry[1], mtimes_ns, now)
+                return entry[0], entry[1]
+
+            try:
+                # The mtimes were taken before loading, so a file replaced
+                # mid-load is seen as changed and re-read on the next check
+                model, scaler = (self._load(path) for path in paths)
+            except FileNotFoundError:
+                if entry is None:
+                    raise
+                return entry[0], entry[1]
+            except Exception as e:
+                if entry is None:
+                    raise
+                print(f"Warning: could not reload '{paths[0]}' and '{paths[1]}', keeping the previous versions: {e}")
+                return entry[0], entry[1]
+
+            if entry is not None:
+                print(f"Reloaded '{key[0]}' and '{key[1]}' together.")
+            self._pairs[key] = (model, scaler, mtimes_ns, now)
+            return model, scaler
+
+    def _load(self, path: str):
+        with timer('model.load'):
+            return joblib.load(path, mmap_mode=self.mmap_mode)
+
+    def reload(self, name: str = None):
+        """Forgets one loaded model (or all of them) so the next get() re-reads the file."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._pairs.clear()
+            else:
+                self._entries.pop(name, None)
+                for key in [key for key in self._pairs if name in key]:
+                    del self._pairs[key]
+
+    def loaded(self) -> list:
+        """Returns the names of the models currently held in memory."""
+        return sorted(set(self._entries).union(*self._pairs))
+
+
+# The process-wide registry used by the scoring scripts. Set MODEL_MMAP_MODE=r
+# in the environment to memory-map the pickled arrays.
+default_registry = ModelRegistry(mmap_mode=os.getenv('MODEL_MMAP_MODE') or None)
+
+
+def get_model(name: str):
+    """Returns a model from the process-wide registry."""
+    return default_registry.get(name)
+
+
+def get_model_pair(model_name: str, scaler_name: str = None) -> tuple:
+    """Returns (model, scaler) from the process-wide registry, always from the same reload."""
+    return default_registry.get_pair(model_name, scaler_name)
@@ -3,44 +3,53 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import IsolationForest
 import joblib
 import warnings
-from mouse_feature_extractor import extract_mouse_features
+from .columnar_store import is_columnar, read_mouse_events
+from .mouse_feature_extractor import FEATURE_COLUMNS, extract_mouse_features_bulk
+from .parallel_extract import extract_mouse_features_parallel
 
 warnings.filterwarnings('ignore')
 
-def train_mouse_model(raw_data_filename: str):
+def train_mouse_model(raw_data_filename: str, group_by='uid', n_jobs: int = 1):
     """
     Processes a raw mouse event log, extracts features for each session,
     and trains an Isolation Forest model on those features.
 
     Args:
-        raw_data_filename (str): Path to the CSV file with raw mouse event logs.
+        raw_data_filename (str): Path to the CSV file with raw mouse event logs, or
+                                 to its Parquet dataset (see columnar_store.py).
+        group_by (str or list): Column(s) that identify one session. Defaults to
+                                'uid'; use ['uid', 'session_id'] when a user can
+                                have several sessions.
+        n_jobs (int): Worker processes for feature extraction; -1 uses every
+                      core. The log is sharded by user across a process pool
+                      and the features are identical to a single-core run.
     """
     # --- 1. Load Raw Data ---
     print(f"Loading raw mouse data from '{raw_data_filename}'...")
     try:
-        raw_df = pd.read_csv(raw_data_filename)
+        if is_columnar(raw_data_filename):
+            # Only the raw log columns are read from the Parquet dataset
+            raw_df = read_mouse_events(raw_data_filename)
+        else:
+            raw_df = pd.read_csv(raw_data_filename)
     except FileNotFoundError:
         print(f"Error: The file '{raw_data_filename}' was not found.")
         return
     print(f"Loaded {len(raw_df)} events.")
 
     # --- 2. Extract Features for Each Session ---
-    print("\nExtracting features for each session... (This may take a moment)")
-    # Group the data by user and session, then apply the feature extractor to each group
-    all_features = []
+    print("\nExtracting features for each session...")
+    # The whole log is sorted once and every session is reduced in a single pass.
     # Using 'uid' as we assume one session per user in this example dataset structure.
-    # If a user could have multiple sessions, you would group by ['uid', 'session_id'].
-    for user_id, session_df in raw_df.groupby('uid'):
-        features = extract_mouse_features(session_df)
-        features['uid'] = user_id  # Keep track of the user
-        all_features.append(features)
-    
-    # Combine all the single-row feature DataFrames into one big DataFrame
-    features_df = pd.concat(all_features, ignore_index=True)
+    # If a user could have multiple sessions, pass group_by=['uid', 'session_id'].
+    if n_jobs == 1:
+        features_df = extract_mouse_features_bulk(raw_df, group_by)
+    else:
+        features_df = extract_mouse_features_parallel(raw_df, group_by, n_jobs=n_jobs)
     print(f"Successfully extracted features for {len(features_df)} unique user sessions.")
     
-    # Prepare data for the model (drop the user ID)
-    X = features_df.drop('uid', axis=1)
+    # Prepare data for the model (drop the session keys)
+    X = features_df[FEATURE_COLUMNS]
 
     # --- 3. Scale the Features ---
     scaler = StandardScaler()
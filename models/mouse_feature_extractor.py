@@ -1,10 +1,90 @@
 import pandas as pd
 import numpy as np
+from .instrumentation import timed
 
 def calculate_distance(x1, y1, x2, y2):
     """Calculates the Euclidean distance between two points."""
     return np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
 
+# Column order of the feature row produced for every session. The trained
+# scaler and model expect exactly these columns in exactly this order.
+FEATURE_COLUMNS = [
+    'duration_seconds',
+    'num_clicks',
+    'num_moves',
+    'total_distance',
+    'avg_velocity_pixels_per_sec',
+    'std_dev_velocity',
+    'straightness'
+]
+
+CLICK_EVENT = 5  # Assuming 5 is a click
+MOVE_EVENT = 2   # Assuming 2 is a move
+
+
+def compute_session_features(timestamps, event_types, screen_x, screen_y) -> dict:
+    """
+    Computes the behavioral features of one session from plain NumPy arrays
+    in a single vectorized pass.
+
+    Args:
+        timestamps (np.ndarray): Event timestamps in milliseconds, sorted ascending.
+        event_types (np.ndarray): Event type codes aligned with `timestamps`.
+        screen_x (np.ndarray): Cursor x positions aligned with `timestamps`.
+        screen_y (np.ndarray): Cursor y positions aligned with `timestamps`.
+
+    Returns:
+        dict: The feature values keyed by the names in FEATURE_COLUMNS.
+    """
+    # --- Basic Metrics ---
+    duration_seconds = (timestamps.max() - timestamps.min()) / 1000.0
+
+    is_move = event_types == MOVE_EVENT
+    num_clicks = int(np.count_nonzero(event_types == CLICK_EVENT))
+    num_moves = int(np.count_nonzero(is_move))
+
+    # --- Movement Metrics ---
+    total_distance = 0
+    avg_velocity = 0
+    std_velocity = 0
+    straightness = 1.0
+
+    if num_moves > 1:
+        move_t = timestamps[is_move]
+        move_x = screen_x[is_move]
+        move_y = screen_y[is_move]
+
+        # Distance and velocity between every pair of consecutive move points
+        dist = calculate_distance(move_x[:-1], move_y[:-1], move_x[1:], move_y[1:])
+        time_delta = (move_t[1:] - move_t[:-1]) / 1000.0
+
+        # Steps with no elapsed time are ignored, exactly like the original loop
+        valid = time_delta > 0
+        if valid.any():
+            dist = dist[valid]
+            velocities = dist / time_delta[valid]
+            # cumsum adds left to right, so the total matches the running sum bit for bit
+            total_distance = np.cumsum(dist)[-1]
+            avg_velocity = np.mean(velocities)
+            std_velocity = np.std(velocities)
+
+        # --- Straightness Metric (Bots move in straighter lines) ---
+        direct_distance = calculate_distance(move_x[0], move_y[0], move_x[-1], move_y[-1])
+        # Ratio of direct distance to path traveled. Closer to 1 is a straighter line.
+        straightness = direct_distance / total_distance if total_distance > 0 else 1.0
+
+    return {
+        'duration_seconds': duration_seconds,
+        'num_clicks': num_clicks,
+        'num_moves': num_moves,
+        'total_distance': total_distance,
+        'avg_velocity_pixels_per_sec': avg_velocity,
+        'std_dev_velocity': std_velocity,
+        'straightness': straightness
+    }
+
+
+@timed('mouse.extract_features')
 def extract_mouse_features(session_df: pd.DataFrame) -> pd.DataFrame:
     """
     Processes a DataFrame of raw mouse event logs for a single session and
@@ -20,52 +100,90 @@ def extract_mouse_features(session_df: pd.DataFrame) -> pd.DataFrame:
     if session_df.empty:
         return pd.DataFrame()
 
-    # Sort by timestamp to ensure correct order
-    session_df = session_df.sort_values('timestamp').reset_index(drop=True)
+    # Sort by timestamp to ensure correct order. A stable sort keeps events that
+    # share a timestamp in their logged order.
+    session_df = session_df.sort_values('timestamp', kind='stable')
+
+    features = compute_session_features(
+        session_df['timestamp'].to_numpy(),
+        session_df['event_type'].to_numpy(),
+        session_df['screen_x'].to_numpy(),
+        session_df['screen_y'].to_numpy()
+    )
+
+    return pd.DataFrame([features])
+
+def compute_grouped_features(group_ids, timestamps, event_types, screen_x, screen_y) -> dict:
+    """
+    Computes the session features of many sessions at once using segment
+    reductions over the group boundaries.
+
+    Args:
+        group_ids (np.ndarray): Dense group number (0, 1, 2, ...) of every event.
+                                Events must be sorted by group and then by timestamp.
+        timestamps (np.ndarray): Event timestamps in milliseconds.
+        event_types (np.ndarray): Event type codes.
+        screen_x (np.ndarray): Cursor x positions.
+        screen_y (np.ndarray): Cursor y positions.
+
+    Returns:
+        dict: One array per name in FEATURE_COLUMNS, indexed by group number.
+    """
+    n_groups = int(group_ids[-1]) + 1 if len(group_ids) else 0
 
     # --- Basic Metrics ---
-    start_time = session_df['timestamp'].min()
-    end_time = session_df['timestamp'].max()
-    duration_seconds = (end_time - start_time) / 1000.0
-    
-    clicks = session_df[session_df['event_type'] == 5]  # Assuming 5 is a click
-    moves = session_df[session_df['event_type'] == 2]   # Assuming 2 is a move
-    
-    num_clicks = len(clicks)
-    num_moves = len(moves)
+    # Events are sorted inside each group, so the first and last rows hold the min and max time
+    group_starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    group_ends = np.r_[group_starts[1:], len(group_ids)] - 1
+    duration_seconds = (timestamps[group_ends] - timestamps[group_starts]) / 1000.0
+
+    is_move = event_types == MOVE_EVENT
+    num_clicks = np.bincount(group_ids[event_types == CLICK_EVENT], minlength=n_groups)
+    num_moves = np.bincount(group_ids[is_move], minlength=n_groups)
 
     # --- Movement Metrics ---
-    total_distance = 0
-    velocities = []
-    
-    # Calculate distance and velocity between consecutive move points
-    if len(moves) > 1:
-        for i in range(1, len(moves)):
-            prev = moves.iloc[i-1]
-            curr = moves.iloc[i]
-            
-            dist = calculate_distance(prev['screen_x'], prev['screen_y'], curr['screen_x'], curr['screen_y'])
-            time_delta = (curr['timestamp'] - prev['timestamp']) / 1000.0
-            
-            if time_delta > 0:
-                total_distance += dist
-                velocities.append(dist / time_delta)
-
-    avg_velocity = np.mean(velocities) if velocities else 0
-    std_velocity = np.std(velocities) if velocities else 0
-    
+    move_g = group_ids[is_move]
+    move_t = timestamps[is_move]
+    move_x = screen_x[is_move]
+    move_y = screen_y[is_move]
+
+    # Consecutive move pairs, keeping only those inside one group with elapsed time
+    dist = calculate_distance(move_x[:-1], move_y[:-1], move_x[1:], move_y[1:])
+    time_delta = (move_t[1:] - move_t[:-1]) / 1000.0
+    valid = (move_g[1:] == move_g[:-1]) & (time_delta > 0)
+    pair_g = move_g[1:][valid]
+    dist = dist[valid]
+    velocities = dist / time_delta[valid]
+
+    # bincount accumulates in input order, so each total is summed left to right
+    total_distance = np.bincount(pair_g, weights=dist, minlength=n_groups)
+    num_steps = np.bincount(pair_g, minlength=n_groups)
+    has_steps = num_steps > 0
+
+    avg_velocity = np.zeros(n_groups)
+    np.divide(np.bincount(pair_g, weights=velocities, minlength=n_groups), num_steps,
+              out=avg_velocity, where=has_steps)
+    # Two-pass population variance, the same formula np.std uses
+    squared_dev = (velocities - avg_velocity[pair_g]) ** 2
+    var_velocity = np.zeros(n_groups)
+    np.divide(np.bincount(pair_g, weights=squared_dev, minlength=n_groups), num_steps,
+              out=var_velocity, where=has_steps)
+    std_velocity = np.sqrt(var_velocity)
+
     # --- Straightness Metric (Bots move in straighter lines) ---
-    if len(moves) > 1:
-        start_point = moves.iloc[0]
-        end_point = moves.iloc[-1]
-        direct_distance = calculate_distance(start_point['screen_x'], start_point['screen_y'], end_point['screen_x'], end_point['screen_y'])
-        
+    straightness = np.ones(n_groups)
+    if len(move_g):
+        move_starts = np.flatnonzero(np.r_[True, move_g[1:] != move_g[:-1]])
+        move_ends = np.r_[move_starts[1:], len(move_g)] - 1
+        direct_distance = calculate_distance(move_x[move_starts], move_y[move_starts],
+                                             move_x[move_ends], move_y[move_ends])
         # Ratio of direct distance to path traveled. Closer to 1 is a straighter line.
-        straightness = direct_distance / total_distance if total_distance > 0 else 1.0
-    else:
-        straightness = 1.0
+        moved_g = move_g[move_starts]
+        moved_total = total_distance[moved_g]
+        straightness[moved_g] = np.divide(direct_distance, moved_total,
+                                          out=np.ones(len(moved_g)), where=moved_total > 0)
 
-    features = {
+    return {
         'duration_seconds': duration_seconds,
         'num_clicks': num_clicks,
         'num_moves': num_moves,
@@ -74,8 +192,242 @@ def extract_mouse_features(session_df: pd.DataFrame) -> pd.DataFrame:
         'std_dev_velocity': std_velocity,
         'straightness': straightness
     }
-    
-    return pd.DataFrame([features])
+
+
+def sort_into_groups(key_codes, timestamps):
+    """
+    Orders events by their group key codes and then by timestamp. Events with
+    a missing key (code -1) are dropped, the same as DataFrame.groupby does by
+    default; ties keep their original row order.
+
+    Args:
+        key_codes (list): One integer code array per group key column.
+        timestamps (np.ndarray): Event timestamps.
+
+    Returns:
+        tuple: (order, boundary) - the row order, and a boolean array that is
+               True wherever a new group starts in that order.
+    """
+    has_key = np.logical_and.reduce([codes >= 0 for codes in key_codes])
+    # lexsort is stable and sorts by the last key first
+    order = np.lexsort([timestamps] + key_codes[::-1])
+    order = order[has_key[order]]
+
+    boundary = np.zeros(len(order), dtype=bool)
+    if len(order):
+        boundary[0] = True
+    for codes in key_codes:
+        sorted_codes = codes[order]
+        boundary[1:] |= sorted_codes[1:] != sorted_codes[:-1]
+    return order, boundary
+
+
+@timed('mouse.extract_features_bulk')
+def extract_mouse_features_bulk(raw_df: pd.DataFrame, group_by='uid') -> pd.DataFrame:
+    """
+    Extracts the session features of a whole raw mouse event log in one go.
+
+    The log is sorted once by the group keys and timestamp, and every feature
+    is computed with segment reductions instead of a Python loop per group.
+
+    Args:
+        raw_df (pd.DataFrame): Raw mouse events with uid, session_id, timestamp,
+                               event_type, screen_x and screen_y columns.
+        group_by (str or list): Column(s) identifying a session, e.g. 'uid' or
+                                ['uid', 'session_id'].
+
+    Returns:
+        pd.DataFrame: One row per group with the FEATURE_COLUMNS followed by
+                      the group key columns, ordered by the group keys.
+    """
+    keys = [group_by] if isinstance(group_by, str) else list(group_by)
+    if raw_df.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS + keys)
+
+    # Encode every key as sorted integer codes (-1 for a missing key)
+    key_codes = []
+    key_uniques = []
+    for key in keys:
+        codes, uniques = pd.factorize(raw_df[key], sort=True)
+        key_codes.append(codes)
+        key_uniques.append(uniques)
+
+    timestamps = raw_df['timestamp'].to_numpy()
+    order, boundary = sort_into_groups(key_codes, timestamps)
+    sorted_codes = [codes[order] for codes in key_codes]
+    group_ids = np.cumsum(boundary) - 1
+
+    features = compute_grouped_features(
+        group_ids,
+        timestamps[order],
+        raw_df['event_type'].to_numpy()[order],
+        raw_df['screen_x'].to_numpy()[order],
+        raw_df['screen_y'].to_numpy()[order]
+    )
+
+    features_df = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+    group_starts = np.flatnonzero(boundary)
+    for key, codes, uniques in zip(keys, sorted_codes, key_uniques):
+        features_df[key] = uniques.take(codes[group_starts])
+    return features_df
+
+class MouseSessionAccumulator:
+    """
+    Folds the raw mouse events of one live session into running aggregates so
+    the session can be scored at any moment without keeping its history.
+
+    Memory use is constant: the first and last move points, the path length,
+    Welford mean/variance of the velocity and the click and move counts. Events
+    must be fed in timestamp order; a move that does not advance the clock is
+    counted but adds no distance, just like in extract_mouse_features.
+    """
+    def __init__(self):
+        self.num_events = 0
+        self.start_time = None
+        self.end_time = None
+        self.num_clicks = 0
+        self.num_moves = 0
+        self.first_move = None  # (x, y) of the first move event
+        self.last_move = None   # (timestamp, x, y) of the latest move event
+        self.total_distance = 0
+        # Welford running statistics of the step velocities
+        self.num_steps = 0
+        self.velocity_mean = 0.0
+        self.velocity_m2 = 0.0
+
+    def add_event(self, timestamp, event_type, screen_x, screen_y):
+        """Folds a single raw event into the session aggregates."""
+        self.num_events += 1
+        if self.start_time is None or timestamp < self.start_time:
+            self.start_time = timestamp
+        if self.end_time is None or timestamp > self.end_time:
+            self.end_time = timestamp
+
+        if event_type == CLICK_EVENT:
+            self.num_clicks += 1
+        elif event_type == MOVE_EVENT:
+            self.num_moves += 1
+            if self.last_move is None:
+                self.first_move = (screen_x, screen_y)
+            else:
+                prev_t, prev_x, prev_y = self.last_move
+                time_delta = (timestamp - prev_t) / 1000.0
+                if time_delta > 0:
+                    dist = calculate_distance(prev_x, prev_y, screen_x, screen_y)
+                    self.total_distance += dist
+                    velocity = dist / time_delta
+                    self.num_steps += 1
+                    delta = velocity - self.velocity_mean
+                    self.velocity_mean += delta / self.num_steps
+                    self.velocity_m2 += delta * (velocity - self.velocity_mean)
+            self.last_move = (timestamp, screen_x, screen_y)
+
+    def add_events(self, timestamps, event_types, screen_x, screen_y):
+        """
+        Folds a batch of raw events, given as aligned arrays in timestamp order,
+        into the session aggregates with one vectorized pass.
+        """
+        timestamps = np.asarray(timestamps)
+        if len(timestamps) == 0:
+            return
+        event_types = np.asarray(event_types)
+        screen_x = np.asarray(screen_x)
+        screen_y = np.asarray(screen_y)
+
+        self.num_events += len(timestamps)
+        batch_start, batch_end = timestamps.min(), timestamps.max()
+        if self.start_time is None or batch_start < self.start_time:
+            self.start_time = batch_start
+        if self.end_time is None or batch_end > self.end_time:
+            self.end_time = batch_end
+
+        is_move = event_types == MOVE_EVENT
+        self.num_clicks += int(np.count_nonzero(event_types == CLICK_EVENT))
+        batch_moves = int(np.count_nonzero(is_move))
+        if batch_moves == 0:
+            return
+        self.num_moves += batch_moves
+
+        move_t = timestamps[is_move]
+        move_x = screen_x[is_move]
+        move_y = screen_y[is_move]
+        if self.last_move is None:
+            self.first_move = (move_x[0], move_y[0])
+        else:
+            # Join the batch onto the previous move so the boundary step is counted
+            prev_t, prev_x, prev_y = self.last_move
+            move_t = np.r_[prev_t, move_t]
+            move_x = np.r_[prev_x, move_x]
+            move_y = np.r_[prev_y, move_y]
+        self.last_move = (move_t[-1], move_x[-1], move_y[-1])
+
+        dist = calculate_distance(move_x[:-1], move_y[:-1], move_x[1:], move_y[1:])
+        time_delta = (move_t[1:] - move_t[:-1]) / 1000.0
+        valid = time_delta > 0
+        if not valid.any():
+            return
+        dist = dist[valid]
+        velocities = dist / time_delta[valid]
+
+        # Sum left to right from the running total, as the per-event path does
+        self.total_distance = np.cumsum(np.r_[self.total_distance, dist])[-1]
+
+        # Merge the batch statistics into the running ones (Chan et al.)
+        batch_steps = len(velocities)
+        batch_mean = np.mean(velocities)
+        batch_m2 = np.sum((velocities - batch_mean) ** 2)
+        steps = self.num_steps + batch_steps
+        delta = batch_mean - self.velocity_mean
+        self.velocity_mean += delta * batch_steps / steps
+        self.velocity_m2 += batch_m2 + delta ** 2 * self.num_steps * batch_steps / steps
+        self.num_steps = steps
+
+    def add_dataframe(self, events_df: pd.DataFrame):
+        """Folds a DataFrame of raw events (same columns as the raw log) into the session."""
+        if events_df.empty:
+            return
+        events_df = events_df.sort_values('timestamp', kind='stable')
+        self.add_events(
+            events_df['timestamp'].to_numpy(),
+            events_df['event_type'].to_numpy(),
+            events_df['screen_x'].to_numpy(),
+            events_df['screen_y'].to_numpy()
+        )
+
+    def to_dict(self) -> dict:
+        """Returns the current feature values keyed by the names in FEATURE_COLUMNS."""
+        if self.num_steps:
+            avg_velocity = self.velocity_mean
+            std_velocity = np.sqrt(self.velocity_m2 / self.num_steps)
+        else:
+            avg_velocity = 0
+            std_velocity = 0
+
+        if self.num_moves > 1:
+            direct_distance = calculate_distance(self.first_move[0], self.first_move[1],
+                                                 self.last_move[1], self.last_move[2])
+            straightness = direct_distance / self.total_distance if self.total_distance > 0 else 1.0
+        else:
+            straightness = 1.0
+
+        return {
+            'duration_seconds': (self.end_time - self.start_time) / 1000.0,
+            'num_clicks': self.num_clicks,
+            'num_moves': self.num_moves,
+            'total_distance': self.total_distance,
+            'avg_velocity_pixels_per_sec': avg_velocity,
+            'std_dev_velocity': std_velocity,
+            'straightness': straightness
+        }
+
+    def to_features(self) -> pd.DataFrame:
+        """
+        Returns the session's features as the same single-row DataFrame that
+        extract_mouse_features would build from the full event history.
+        """
+        if self.num_events == 0:
+            return pd.DataFrame()
+        return pd.DataFrame([self.to_dict()])
 
 if __name__ == '__main__':
     # This is an example of how to use the feature extractor
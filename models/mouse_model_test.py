@@ -1,49 +1,69 @@
+import numpy as np
 import pandas as pd
-import joblib
-from mouse_feature_extractor import extract_mouse_features
+from .model_registry import get_model_pair
+from .anomaly_scoring import score_anomaly_batch
+from .mouse_feature_extractor import FEATURE_COLUMNS, extract_mouse_features
 import warnings
 
 warnings.filterwarnings('ignore')
 
+def score_mouse(batch) -> np.ndarray:
+    """
+    Scores a batch of extracted mouse session features with the mouse anomaly model.
+
+    Args:
+        batch (pd.DataFrame or np.ndarray): N rows of mouse features, e.g. the
+                                            output of extract_mouse_features_bulk
+                                            or MouseSessionAccumulator rows.
+
+    Returns:
+        np.ndarray: N records with a 'label' field (1 = normal, -1 = anomaly) and
+                    a 'score' field (negative scores are more anomalous).
+
+    Raises:
+        FileNotFoundError: If the model has not been trained yet.
+    """
+    if isinstance(batch, pd.DataFrame):
+        batch = batch[FEATURE_COLUMNS]
+    # The model and scaler are loaded once per process, and reloaded together, by the registry
+    model, scaler = get_model_pair('mouse_model')
+    return score_anomaly_batch(model, scaler, batch, stage='mouse')
+
+
 def check_mouse_pattern(mouse_features_df: pd.DataFrame):
     """
-    Loads the trained mouse anomaly model and predicts whether a given
-    set of mouse features is normal (human) or an anomaly (potential bot).
+    Predicts whether a given set of mouse features is normal (human) or an
+    anomaly (potential bot) and prints the result.
 
     Args:
         mouse_features_df (pd.DataFrame): A DataFrame with a single row of
                                           extracted mouse features.
+
+    Returns:
+        np.ndarray: The record returned by score_mouse, or None on error.
     """
     if mouse_features_df.empty:
         print("Warning: Input feature DataFrame is empty. Cannot make a prediction.")
         return
 
     try:
-        # Load the trained mouse model and its specific scaler
-        model = joblib.load('models/mouse_anomaly_model.pkl')
-        scaler = joblib.load('models/mouse_scaler.pkl')
+        result = score_mouse(mouse_features_df)[0]
     except FileNotFoundError:
         print("Error: Could not find the required mouse .pkl files.")
         print("Please run 'train_mouse_anomaly.py' first to generate them.")
         return
 
-    # --- 1. Prepare and Scale the Data ---
-    sample_scaled = scaler.transform(mouse_features_df)
-
-    # --- 2. Make the Prediction ---
-    prediction = model.predict(sample_scaled)
-    anomaly_score = model.decision_function(sample_scaled)
-
-    # --- 3. Interpret and Display the Result ---
+    # --- Interpret and Display the Result ---
     print("\n--- Mouse Anomaly Detection Result ---")
-    print(f"Anomaly Score: {anomaly_score[0]:.4f} (Negative scores are more anomalous)")
+    print(f"Anomaly Score: {result['score']:.4f} (Negative scores are more anomalous)")
     
-    if prediction[0] == 1:
+    if result['label'] == 1:
         print("Prediction: NORMAL Pattern")
         print("Interpretation: Mouse movement is consistent with a human user.")
     else:
         print("Prediction: ANOMALY DETECTED")
         print("Interpretation: Mouse movement is suspicious and could be a bot.")
+    return result
 
 
 if __name__ == '__main__':
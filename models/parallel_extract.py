@@ -0,0 +1,259 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from .instrumentation import timed
+from .mouse_feature_extractor import FEATURE_COLUMNS, compute_grouped_features, sort_into_groups, extract_mouse_features_bulk
+
+# Below this many rows a process pool costs more than it saves
+MIN_PARALLEL_ROWS = 100_000
+# Shards per worker, so one slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """Turns an n_jobs setting into a worker count (-1 means every core, -2 all but one, ...)."""
+    n_cpus = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, n_cpus + 1 + n_jobs)
+    return n_jobs
+
+
+# --- Shared Memory Arrays ---
+
+def _allocate(shape, dtype):
+    """A new shared memory array (zero-filled by the OS); returns (block, spec) where spec reattaches it."""
+    dtype = np.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    return block, (block.name, dtype.str, tuple(np.atleast_1d(shape)))
+
+
+def _share(array: np.ndarray, order=None):
+    """Copies an array (or array[order], without a temporary) into a new shared memory block."""
+    block, spec = _allocate(array.shape if order is None else order.shape, array.dtype)
+    if order is None:
+        _view(block, spec)[...] = array
+    else:
+        np.take(array, order, out=_view(block, spec))
+    return block, spec
+
+
+def _view(block, spec) -> np.ndarray:
+    return np.ndarray(spec[2], dtype=np.dtype(spec[1]), buffer=block.buf)
+
+
+def _run_attached(func, specs, *args):
+    """
+    Attaches to the shared blocks named in `specs` and calls func(arrays, *args).
+    The views are gone once func returns, so the blocks can be closed; func
+    must not return views of them.
+    """
+    blocks = [shared_memory.SharedMemory(name=spec[0]) for spec in specs]
+    try:
+        return func([_view(block, spec) for block, spec in zip(blocks, specs)], *args)
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _release(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# --- Worker Functions ---
+# Module-level so the pool can pickle them by name. Only shard bounds and
+# block names are sent to the workers; the arrays themselves are shared.
+
+def _mouse_shard_features(arrays, n_keys: int, start: int, stop: int):
+    """Features of the sessions in rows [start, stop) of the shard-ordered columns."""
+    key_codes = [codes[start:stop] for codes in arrays[:n_keys]]
+    timestamps, event_types, screen_x, screen_y = (column[start:stop] for column in arrays[n_keys:])
+
+    order, boundary = sort_into_groups(key_codes, timestamps)
+    features = compute_grouped_features(
+        np.cumsum(boundary) - 1,
+        timestamps[order],
+        event_types[order],
+        screen_x[order],
+        screen_y[order]
+    )
+    group_starts = order[np.flatnonzero(boundary)]
+    return features, [codes[group_starts] for codes in key_codes]
+
+
+def _parse_ip_chunk(arrays, start: int, stop: int, parser):
+    """Parses rows [start, stop) of the shared bytes array into the shared output arrays."""
+    raw, ip_ints, is_valid = arrays
+    ip_ints[start:stop], is_valid[start:stop] = parser(raw[start:stop])
+
+
+class ParallelExtractor:
+    """
+    Runs the single-core preprocessing steps of training on a pool of worker
+    processes: session feature extraction of a raw mouse log, and the IP
+    string to integer conversion of the IP intelligence tables.
+
+    Inputs are never pickled to the workers. The parent writes the columns
+    once into shared memory blocks and sends each worker only the block
+    names and the row range of its shard; workers send back only their
+    (much smaller) per-session results.
+
+    The mouse log is sharded by a hash of the session key, so every session
+    lands whole in one shard, and the shard results are put back in group
+    key order. The output is identical to extract_mouse_features_bulk no
+    matter how many workers there are or in which order they finish.
+    """
+    def __init__(self, n_jobs: int = -1, min_rows: int = MIN_PARALLEL_ROWS):
+        """
+        Args:
+            n_jobs (int): Worker processes; -1 uses every core.
+            min_rows (int): Inputs with fewer rows are processed in this
+                            process instead.
+        """
+        self.n_workers = resolve_n_jobs(n_jobs)
+        self.min_rows = min_rows
+        self._pool = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Started on first use, so a small run never forks
+        if self._pool is None:
+            # Workers must share this process's resource tracker; one of their
+            # own would unlink the blocks they attached to when they exit
+            resource_tracker.ensure_running()
+            self._pool = ProcessPoolExecutor(max_workers=self.n_workers)
+        return self._pool
+
+    def close(self):
+        """Stops the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _use_pool(self, n_rows: int) -> bool:
+        return self.n_workers > 1 and n_rows >= self.min_rows
+
+    # --- Mouse Features ---
+
+    @timed('mouse.extract_features_parallel')
+    def mouse_features(self, raw_df: pd.DataFrame, group_by='uid') -> pd.DataFrame:
+        """
+        Parallel extract_mouse_features_bulk: same arguments, same result.
+
+        Args:
+            raw_df (pd.DataFrame): Raw mouse events with uid, session_id, timestamp,
+                                   event_type, screen_x and screen_y columns.
+            group_by (str or list): Column(s) identifying a session.
+
+        Returns:
+            pd.DataFrame: One row per group with the FEATURE_COLUMNS followed by
+                          the group key columns, ordered by the group keys.
+        """
+        keys = [group_by] if isinstance(group_by, str) else list(group_by)
+        if not self._use_pool(len(raw_df)):
+            return extract_mouse_features_bulk(raw_df, group_by)
+
+        # Sorted codes per key, exactly as the serial version encodes them
+        key_codes = []
+        key_uniques = []
+        for key in keys:
+            codes, uniques = pd.factorize(raw_df[key], sort=True)
+            key_codes.append(codes.astype(np.int64))
+            key_uniques.append(uniques)
+
+        # Shard by a hash of the first key (the user), stable across processes and runs
+        n_shards = self.n_workers * SHARDS_PER_WORKER
+        uid_shard = pd.util.hash_array(np.asarray(key_uniques[0], dtype=object)) % np.uint64(n_shards)
+        row_shard = np.where(key_codes[0] >= 0, uid_shard.astype(np.int64)[key_codes[0]], 0)
+        # A stable sort keeps the original row order inside every shard
+        shard_order = np.argsort(row_shard, kind='stable')
+        bounds = np.searchsorted(row_shard[shard_order], np.arange(n_shards + 1))
+
+        columns = key_codes + [raw_df[name].to_numpy() for name in
+                               ('timestamp', 'event_type', 'screen_x', 'screen_y')]
+        blocks = []
+        specs = []
+        try:
+            for column in columns:
+                block, spec = _share(column, shard_order)
+                blocks.append(block)
+                specs.append(spec)
+            futures = [
+                self.pool.submit(_run_attached, _mouse_shard_features, specs, len(keys), int(start), int(stop))
+                for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+            ]
+            results = [future.result() for future in futures]
+        finally:
+            _release(blocks)
+
+        return self._merge_mouse_shards(results, keys, key_uniques)
+
+    @staticmethod
+    def _merge_mouse_shards(results, keys, key_uniques) -> pd.DataFrame:
+        """Concatenates the shard results and orders them by group key codes."""
+        if not results:
+            return pd.DataFrame(columns=FEATURE_COLUMNS + keys)
+        group_codes = [np.concatenate([codes[i] for _, codes in results]) for i in range(len(keys))]
+        order = np.lexsort(group_codes[::-1])
+
+        features_df = pd.DataFrame({
+            name: np.concatenate([features[name] for features, _ in results])[order]
+            for name in FEATURE_COLUMNS
+        }, columns=FEATURE_COLUMNS)
+        for key, codes, uniques in zip(keys, group_codes, key_uniques):
+            features_df[key] = uniques.take(codes[order])
+        return features_df
+
+    # --- IP Conversion ---
+
+    def parse_ipv4_bytes(self, raw: np.ndarray):
+        """
+        Parallel _parse_ipv4_bytes for parse_ips(bytes_parser=...). The
+        fixed-width bytes array is split into one contiguous chunk per
+        worker, and workers write straight into shared output arrays.
+
+        Returns:
+            tuple: (ip_ints, is_valid) as an int64 array and a boolean array.
+        """
+        from .fingerprint_model import _parse_ipv4_bytes
+        if not self._use_pool(len(raw)):
+            return _parse_ipv4_bytes(raw)
+
+        blocks = []
+        try:
+            raw_block, raw_spec = _share(raw)
+            blocks.append(raw_block)
+            ints_block, ints_spec = _allocate(len(raw), np.int64)
+            blocks.append(ints_block)
+            valid_block, valid_spec = _allocate(len(raw), bool)
+            blocks.append(valid_block)
+
+            specs = [raw_spec, ints_spec, valid_spec]
+            bounds = np.linspace(0, len(raw), self.n_workers + 1).astype(np.int64)
+            futures = [
+                self.pool.submit(_run_attached, _parse_ip_chunk, specs, int(start), int(stop), _parse_ipv4_bytes)
+                for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+            ]
+            for future in futures:
+                future.result()
+            return _view(ints_block, ints_spec).copy(), _view(valid_block, valid_spec).copy()
+        finally:
+            _release(blocks)
+
+
+def extract_mouse_features_parallel(raw_df: pd.DataFrame, group_by='uid', n_jobs: int = -1) -> pd.DataFrame:
+    """extract_mouse_features_bulk on `n_jobs` worker processes (see ParallelExtractor)."""
+    with ParallelExtractor(n_jobs=n_jobs) as extractor:
+        return extractor.mouse_features(raw_df, group_by)
+
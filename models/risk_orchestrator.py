@@ -0,0 +1,188 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from .model_registry import get_model
+from .keyboard_model_test import score_keystrokes
+from .mouse_model_test import score_mouse
+from .mouse_feature_extractor import extract_mouse_features
+from .fingerprint_model import get_combined_features
+from .live_face import MAX_WORKERS, verify_facial_identity
+from .scoring_service import MOUSE_EVENT_COLUMNS, DEVICE_THRESHOLD, verdict_from_scores
+
+
+class RiskOrchestrator:
+    """
+    Runs every check of one risk decision concurrently under an overall
+    deadline, so the decision takes as long as the slowest check instead of
+    the sum of all of them.
+
+    The CPU-bound models (keystroke, mouse, device) run on a dedicated thread
+    pool; the network-bound face check runs on a second pool of its own, so a
+    slow Rekognition call never holds up a model worker. Both pools belong to
+    the orchestrator and outlive every event loop, so neither evaluate() nor
+    evaluate_sync() ever waits for an abandoned check to finish.
+    Checks still running at the deadline are abandoned and reported in
+    'timed_out'; the verdict is built from the checks that finished.
+
+    The payload has the keys of FraudScoringService payloads plus, for the
+    face check, 'id_image' and 'selfie_image' (image bytes).
+    """
+    def __init__(self, ip_intelligence=None, face_comparer=None, max_workers: int = 4, deadline: float = 2.0):
+        """
+        Args:
+            ip_intelligence (IPIntelligence): Loaded IP database; without it the device check is skipped.
+            face_comparer: Comparer passed to verify_facial_identity (default: Rekognition).
+            max_workers (int): Threads for the CPU-bound model checks.
+            deadline (float): Default seconds allowed for a whole decision.
+        """
+        self.ip_intelligence = ip_intelligence
+        self.face_comparer = face_comparer
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='risk-model')
+        self._face_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='risk-face')
+
+    def close(self):
+        """Stops the model and face worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._face_executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Individual Checks ---
+
+    @staticmethod
+    def _check_keystroke(keystrokes: dict) -> dict:
+        result = score_keystrokes(pd.DataFrame([keystrokes]))[0]
+        return {'label': int(result['label']), 'score': float(result['score'])}
+
+    @staticmethod
+    def _check_mouse(mouse_events) -> dict:
+        features = extract_mouse_features(pd.DataFrame(mouse_events, columns=MOUSE_EVENT_COLUMNS))
+        if features.empty:
+            return {'error': 'No mouse events to score.'}
+        result = score_mouse(features)[0]
+        return {'label': int(result['label']), 'score': float(result['score'])}
+
+    def _check_device(self, ip: str, user_agent: str) -> dict:
+        model = get_model('device_model')
+        features = pd.DataFrame([get_combined_features(ip, user_agent, self.ip_intelligence)])
+        probability = float(model.predict_proba(features)[0, 1])
+        return {'label': -1 if probability >= DEVICE_THRESHOLD else 1, 'suspicious_probability': probability}
+
+    async def _check_face(self, id_image: bytes, selfie_image: bytes) -> dict:
+        verify = functools.partial(verify_facial_identity, id_image, selfie_image, comparer=self.face_comparer)
+        result = await asyncio.get_running_loop().run_in_executor(self._face_executor, verify)
+        if 'match' not in result:
+            return {'error': result.get('message', 'Face verification failed.')}
+        return {'label': 1 if result['match'] else -1, 'confidence': result['confidence']}
+
+    def _checks(self, payload: dict) -> dict:
+        """Starts every check the payload has inputs for; returns name -> awaitable."""
+        loop = asyncio.get_running_loop()
+        checks = {}
+        if payload.get('keystrokes'):
+            checks['keystroke'] = loop.run_in_executor(self._executor, self._check_keystroke, payload['keystrokes'])
+        if payload.get('mouse_events') is not None:
+            checks['mouse'] = loop.run_in_executor(self._executor, self._check_mouse, payload['mouse_events'])
+        if self.ip_intelligence is not None and payload.get('ip') and payload.get('user_agent'):
+            checks['device'] = loop.run_in_executor(self._executor, self._check_device,
+                                                    payload['ip'], payload['user_agent'])
+        if payload.get('id_image') and payload.get('selfie_image'):
+            checks['face'] = asyncio.ensure_future(self._check_face(payload['id_image'], payload['selfie_image']))
+        return checks
+
+    # --- Decisions ---
+
+    async def evaluate(self, payload: dict, deadline: float = None) -> dict:
+        """
+        Runs all applicable checks concurrently and waits at most `deadline` seconds.
+
+        Returns:
+            dict: 'verdict' from the finished checks, 'scores' per check,
+                  'timed_out' (checks abandoned at the deadline) and
+                  'elapsed_ms'.
+        """
+        start = time.perf_counter()
+        deadline = self.deadline if deadline is None else deadline
+        checks = self._checks(payload)
+        if checks:
+            await asyncio.wait(checks.values(), timeout=deadline)
+
+        scores = {}
+        timed_out = []
+        for name, check in checks.items():
+            if not check.done():
+                check.cancel()
+                timed_out.append(name)
+            elif isinstance(check.exception(), FileNotFoundError):
+                scores[name] = {'error': f'The {name} model has not been trained.'}
+            elif check.exception() is not None:
+                scores[name] = {'error': str(check.exception())}
+            else:
+                scores[name] = check.result()
+
+        return {
+            'verdict': verdict_from_scores(scores),
+            'scores': scores,
+            'timed_out': timed_out,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def evaluate_sync(self, payload: dict, deadline: float = None) -> dict:
+        """evaluate() for callers without an event loop."""
+        start = time.perf_counter()
+        result = asyncio.run(self.evaluate(payload, deadline))
+        # Includes creating and closing the event loop, i.e. what the caller waited
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        return result
+
+
+if __name__ == '__main__':
+    # Compare the concurrent decision with running the same checks one after another
+    import numpy as np
+    from .fingerprint_model import IPIntelligence, ASN_FILE_PATH, COUNTRY_FILE_PATH
+    from .live_face import FakeFaceComparer
+
+    ip_db = IPIntelligence(asn_filepath=ASN_FILE_PATH, country_filepath=COUNTRY_FILE_PATH)
+    try:
+        timing_columns = get_model('keyboard_scaler').feature_names_in_
+    except (FileNotFoundError, AttributeError):
+        timing_columns = []
+
+    rng = np.random.default_rng(0)
+    payload = {
+        'keystrokes': {col: float(rng.uniform(0.05, 0.3)) for col in timing_columns},
+        'mouse_events': {
+            'timestamp': np.cumsum(rng.integers(5, 40, size=200)),
+            'event_type': np.where(rng.random(200) < 0.1, 5, 2),
+            'screen_x': np.cumsum(rng.normal(0, 20, size=200)),
+            'screen_y': np.cumsum(rng.normal(0, 20, size=200))
+        },
+        'ip': '8.8.8.8',
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0',
+        'id_image': b'applicant',
+        'selfie_image': b'applicant'
+    }
+
+    face_comparer = FakeFaceComparer(latency=0.3, jitter=0)
+    with RiskOrchestrator(ip_intelligence=ip_db, face_comparer=face_comparer) as orchestrator:
+        orchestrator.evaluate_sync(payload)  # load the models once
+
+        start = time.perf_counter()
+        orchestrator._check_keystroke(payload['keystrokes'])
+        orchestrator._check_mouse(payload['mouse_events'])
+        orchestrator._check_device(payload['ip'], payload['user_agent'])
+        verify_facial_identity(payload['id_image'], payload['selfie_image'], comparer=face_comparer)
+        print(f"\nChecks one after another: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        result = orchestrator.evaluate_sync(payload)
+        print(f"Checks concurrently:      {result['elapsed_ms']:.1f} ms -> {result}")
+
+        result = orchestrator.evaluate_sync(payload, deadline=0.1)
+        print(f"With a 100 ms deadline:   {result['elapsed_ms']:.1f} ms -> {result}")
@@ -0,0 +1,326 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+import numpy as np
+import pandas as pd
+from .model_registry import get_model, get_model_pair
+from .anomaly_scoring import score_anomaly_batch
+from .mouse_model_test import score_mouse
+from .mouse_feature_extractor import extract_mouse_features_bulk
+from .fingerprint_model import get_combined_features_batch
+
+# Raw mouse event fields expected in a payload's 'mouse_events'
+MOUSE_EVENT_COLUMNS = ['timestamp', 'event_type', 'screen_x', 'screen_y']
+# Device model probability at or above which a request is treated as suspicious
+DEVICE_THRESHOLD = 0.5
+
+
+def verdict_from_scores(scores: dict) -> str:
+    """'bot' if any model flagged the request, 'human' if all that ran passed it, else 'unknown'."""
+    labels = [result['label'] for result in scores.values() if 'label' in result]
+    if not labels:
+        return 'unknown'
+    return 'bot' if min(labels) == -1 else 'human'
+
+
+class FraudScoringService:
+    """
+    Scores combined fraud-check payloads with every model, collecting
+    concurrent requests into micro-batches so each model runs one batched
+    inference per batch instead of one call per request.
+
+    A payload is a dict with any of these keys; models whose inputs are
+    missing are skipped for that request:
+        'keystrokes':   {timing column: seconds} for one typing sample
+        'mouse_events': list of {timestamp, event_type, screen_x, screen_y}
+                        (or a DataFrame) for one session
+        'ip':           client IP address string
+        'user_agent':   User-Agent header
+    """
+    def __init__(self, ip_intelligence=None, max_wait_ms: float = 2.0, max_batch_size: int = 64):
+        """
+        Args:
+            ip_intelligence (IPIntelligence): Loaded IP database for the device
+                                              model; without it the device model is skipped.
+            max_wait_ms (float): Longest time the first request of a batch
+                                 waits for more requests to join it.
+            max_batch_size (int): Maximum number of requests scored together.
+        """
+        self.ip_intelligence = ip_intelligence
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = False
+        # Makes "not stopping" and queueing one step, so nothing lands behind the stop sentinel
+        self._submit_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    # --- Request Handling ---
+
+    def start(self):
+        """Starts the batching worker thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='fraud-scoring', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Scores whatever is already queued, then stops the worker thread."""
+        with self._submit_lock:
+            if self._thread is None or self._stopping:
+                return
+            self._stopping = True
+            self._queue.put(None)
+        self._thread.join()
+        with self._submit_lock:
+            self._thread = None
+            self._stopping = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, payload: dict) -> Future:
+        """Queues a payload and returns a Future that resolves to its result dict."""
+        future = Future()
+        with self._submit_lock:
+            if self._thread is None:
+                raise RuntimeError("The scoring service has not been started.")
+            if self._stopping:
+                raise RuntimeError("The scoring service is stopping.")
+            self._queue.put((payload, future))
+        return future
+
+    def score(self, payload: dict, timeout: float = None) -> dict:
+        """Scores one payload through the micro-batcher and waits for the result."""
+        return self.submit(payload).result(timeout=timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Drop requests whose caller cancelled them while queued; the rest
+            # are marked running, so they can no longer be cancelled
+            batch = [(payload, future) for payload, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            payloads = [payload for payload, _ in batch]
+            try:
+                results = self.score_many(payloads)
+            except Exception as e:
+                for _, future in batch:
+                    self._resolve(future, error=e)
+                continue
+            for (_, future), result in zip(batch, results):
+                self._resolve(future, result=result)
+
+    @staticmethod
+    def _resolve(future, result=None, error=None):
+        # An already resolved future must not take down the worker thread
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    # --- Batched Inference ---
+
+    def score_many(self, payloads: list) -> list:
+        """
+        Scores a list of payloads directly, with one inference call per model.
+
+        Returns:
+            list: One dict per payload with a 'verdict' ('bot', 'human' or
+                  'unknown') and a 'scores' dict holding each model's result.
+        """
+        self.batches += 1
+        self.requests += len(payloads)
+        scores = [{} for _ in payloads]
+        self._score_keystrokes(payloads, scores)
+        self._score_mouse(payloads, scores)
+        self._score_devices(payloads, scores)
+        return [{'verdict': verdict_from_scores(request_scores), 'scores': request_scores} for request_scores in scores]
+
+    @staticmethod
+    def _fill(scores, name, rows, records):
+        for i, record in zip(rows, records):
+            scores[i][name] = {'label': int(record['label']), 'score': float(record['score'])}
+
+    @staticmethod
+    def _fail(scores, name, rows, message):
+        for i in rows:
+            scores[i][name] = {'error': message}
+
+    def _score_isolated(self, name, score_rows, rows, scores):
+        """
+        Runs score_rows(rows) as one batch. If the batch raises, every request
+        is retried on its own, so only the requests that cause the error get it.
+        """
+        try:
+            score_rows(rows)
+        except FileNotFoundError:
+            self._fail(scores, name, rows, f'{name.capitalize()} model has not been trained.')
+        except Exception as e:
+            if len(rows) == 1:
+                self._fail(scores, name, rows, f'Could not score the {name} input: {e}')
+                return
+            for i in rows:
+                self._score_isolated(name, score_rows, [i], scores)
+
+    def _score_keystrokes(self, payloads, scores):
+        rows = [i for i, payload in enumerate(payloads) if payload.get('keystrokes')]
+        if not rows:
+            return
+        try:
+            # One pair for the whole batch, so the columns checked are the ones
+            # of the scaler that scores them, even across a hot-reload
+            model, scaler = get_model_pair('keyboard_model')
+            columns = list(scaler.feature_names_in_)
+        except FileNotFoundError:
+            self._fail(scores, 'keystroke', rows, 'Keystroke model has not been trained.')
+            return
+
+        # Every sample needs every timing column as a finite number; anything
+        # else would be scored as NaN, or break the batch it happens to share
+        valid = []
+        values = []
+        for i in rows:
+            sample = payloads[i]['keystrokes']
+            missing = [col for col in columns if col not in sample]
+            if missing:
+                self._fail(scores, 'keystroke', [i], f'Missing keystroke timing column: {missing[0]!r}')
+                continue
+            try:
+                row = np.array([sample[col] for col in columns], dtype=np.float64)
+            except (TypeError, ValueError):
+                self._fail(scores, 'keystroke', [i], 'Keystroke timings must be numbers.')
+                continue
+            if not np.isfinite(row).all():
+                self._fail(scores, 'keystroke', [i], 'Keystroke timings must be finite numbers.')
+                continue
+            valid.append(i)
+            values.append(row)
+        if not valid:
+            return
+        values = dict(zip(valid, values))
+
+        def score_rows(rows):
+            batch = pd.DataFrame([values[i] for i in rows], columns=columns)
+            self._fill(scores, 'keystroke', rows, score_anomaly_batch(model, scaler, batch, stage='keyboard'))
+
+        self._score_isolated('keystroke', score_rows, valid, scores)
+
+    def _score_mouse(self, payloads, scores):
+        sessions = {}
+        for i, payload in enumerate(payloads):
+            if payload.get('mouse_events') is None:
+                continue
+            try:
+                session = pd.DataFrame(payload['mouse_events'], columns=MOUSE_EVENT_COLUMNS)
+                for col in MOUSE_EVENT_COLUMNS:
+                    session[col] = pd.to_numeric(session[col])
+            except (TypeError, ValueError) as e:
+                self._fail(scores, 'mouse', [i], f'Invalid mouse events: {e}')
+                continue
+            if not session.empty:
+                session['request'] = i
+                sessions[i] = session
+        if not sessions:
+            return
+
+        def score_rows(rows):
+            # All sessions of the batch are reduced together, grouped by request
+            events = pd.concat([sessions[i] for i in rows], ignore_index=True)
+            features = extract_mouse_features_bulk(events, group_by='request')
+            self._fill(scores, 'mouse', features['request'].tolist(), score_mouse(features))
+
+        self._score_isolated('mouse', score_rows, list(sessions), scores)
+
+    def _score_devices(self, payloads, scores):
+        if self.ip_intelligence is None:
+            return
+        rows = [i for i, payload in enumerate(payloads) if payload.get('ip') and payload.get('user_agent')]
+        if not rows:
+            return
+
+        def score_rows(rows):
+            model = get_model('device_model')
+            features = get_combined_features_batch(
+                [payloads[i]['ip'] for i in rows], [payloads[i]['user_agent'] for i in rows], self.ip_intelligence
+            )
+            probabilities = model.predict_proba(features)[:, 1]
+            for i, probability in zip(rows, probabilities):
+                scores[i]['device'] = {
+                    'label': -1 if probability >= DEVICE_THRESHOLD else 1,
+                    'suspicious_probability': float(probability)
+                }
+
+        self._score_isolated('device', score_rows, rows, scores)
+
+    def stats(self) -> dict:
+        """Returns the batching counters as a plain dict."""
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize()
+        }
+
+
+if __name__ == '__main__':
+    # Score a few concurrent synthetic requests with whatever models are trained
+    from concurrent.futures import ThreadPoolExecutor
+    from .fingerprint_model import IPIntelligence, ASN_FILE_PATH, COUNTRY_FILE_PATH
+
+    ip_db = IPIntelligence(asn_filepath=ASN_FILE_PATH, country_filepath=COUNTRY_FILE_PATH)
+    try:
+        timing_columns = get_model('keyboard_scaler').feature_names_in_
+    except (FileNotFoundError, AttributeError):
+        timing_columns = []
+
+    rng = np.random.default_rng(0)
+    payloads = []
+    for i in range(200):
+        times = np.cumsum(rng.integers(5, 40, size=50))
+        payloads.append({
+            'keystrokes': {col: float(rng.uniform(0.05, 0.3)) for col in timing_columns},
+            'mouse_events': {
+                'timestamp': times,
+                'event_type': np.where(rng.random(50) < 0.1, 5, 2),
+                'screen_x': np.cumsum(rng.normal(0, 20, size=50)),
+                'screen_y': np.cumsum(rng.normal(0, 20, size=50))
+            },
+            'ip': f"{rng.integers(1, 224)}.{rng.integers(0, 256)}.{rng.integers(0, 256)}.{rng.integers(1, 255)}",
+            'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) HeadlessChrome/90.0' if i % 4 == 0
+                          else 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0'
+        })
+
+    with FraudScoringService(ip_intelligence=ip_db) as service, ThreadPoolExecutor(max_workers=32) as clients:
+        start = time.perf_counter()
+        results = list(clients.map(service.score, payloads))
+        elapsed = time.perf_counter() - start
+
+    print(f"\nScored {len(results)} requests in {elapsed * 1000:.1f} ms: {service.stats()}")
+    print("First result:", results[0])
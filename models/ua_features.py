@@ -0,0 +1,85 @@
+import re
+import numpy as np
+import pandas as pd
+from .lru_cache import LRUCache, MISSING
+
+# Device signatures found in user agents, by name. Any substring of a
+# signature counts as a match; more substrings for an existing signature
+# only need to be added here.
+UA_SIGNATURES = {
+    'outdated_os': ['windows nt 6.1'],
+    'automation': ['headless', 'puppeteer'],
+    'linux': ['linux'],
+    'android': ['android']
+}
+# The user agent features of the device model, in model column order, as
+# column -> (signature that sets it, signature that clears it or None).
+# A new signature only becomes a feature once a column here uses it, and a
+# new column changes the device model's inputs, so it needs a retrain.
+UA_FEATURES = {
+    'is_outdated_os': ('outdated_os', None),
+    'is_headless': ('automation', None),
+    'os_linux_server': ('linux', 'android')
+}
+UA_FEATURE_COLUMNS = list(UA_FEATURES)
+# Distinct user agents remembered by the parse cache
+UA_CACHE_SIZE = 4096
+
+
+def _compile_signatures(signatures: dict) -> re.Pattern:
+    """One case-insensitive alternation with a named group per signature."""
+    groups = []
+    for name, substrings in signatures.items():
+        groups.append(f"(?P<{name}>{'|'.join(re.escape(s) for s in substrings)})")
+    return re.compile('|'.join(groups), re.IGNORECASE)
+
+
+_SIGNATURE_PATTERN = _compile_signatures(UA_SIGNATURES)
+_cache = LRUCache(max_size=UA_CACHE_SIZE)
+
+
+def _parse(user_agent: str) -> tuple:
+    """Scans a user agent once and returns its feature values in UA_FEATURE_COLUMNS order."""
+    found = {match.lastgroup for match in _SIGNATURE_PATTERN.finditer(user_agent or '')}
+    return tuple(int(signature in found and excluded not in found) for signature, excluded in UA_FEATURES.values())
+
+
+def extract_ua_features(user_agent: str) -> dict:
+    """
+    Extracts the device flags of one user agent. Results are kept in a bounded
+    LRU cache keyed by the raw string, since few distinct user agents make up
+    most of the traffic.
+
+    Args:
+        user_agent (str): The raw User-Agent header.
+
+    Returns:
+        dict: The UA_FEATURE_COLUMNS flags as 0/1 integers.
+    """
+    values = _cache.get(user_agent)
+    if values is MISSING:
+        values = _parse(user_agent)
+        _cache.put(user_agent, values)
+    return dict(zip(UA_FEATURE_COLUMNS, values))
+
+
+def extract_ua_features_bulk(user_agents) -> pd.DataFrame:
+    """
+    Extracts the device flags of a whole column of user agents, parsing each
+    distinct string only once.
+
+    Args:
+        user_agents (list-like): Raw User-Agent strings; missing values count as empty.
+
+    Returns:
+        pd.DataFrame: One row per input, with the UA_FEATURE_COLUMNS columns.
+    """
+    codes, uniques = pd.factorize(pd.Series(user_agents, dtype=object), use_na_sentinel=False)
+    values = np.array([_parse(ua if isinstance(ua, str) else '') for ua in uniques], dtype=np.int64)
+    values = values.reshape(len(uniques), len(UA_FEATURE_COLUMNS))[codes]
+    return pd.DataFrame(values, columns=UA_FEATURE_COLUMNS)
+
+
+def ua_cache_stats() -> dict:
+    """Returns the hit/miss counters of the user agent parse cache."""
+    return _cache.stats()
@@ -0,0 +1,30 @@
+import threading
+
+from models.scoring_service import FraudScoringService
+
+
+def test_cancelled_request_does_not_stop_the_worker():
+    scoring = threading.Event()
+    release = threading.Event()
+
+    def score_many(payloads):
+        # Holds the first batch so the next requests wait in the queue
+        if any(payload.get('block') for payload in payloads):
+            scoring.set()
+            release.wait(timeout=5)
+        return [{'verdict': 'unknown', 'scores': {}, 'id': payload.get('id')} for payload in payloads]
+
+    service = FraudScoringService(max_wait_ms=0)
+    service.score_many = score_many
+    with service:
+        blocker = service.submit({'block': True})
+        assert scoring.wait(timeout=5)
+        cancelled = service.submit({'id': 'cancelled'})
+        kept = service.submit({'id': 'kept'})
+        assert cancelled.cancel()
+        release.set()
+
+        assert blocker.result(timeout=5)['verdict'] == 'unknown'
+        assert kept.result(timeout=5)['id'] == 'kept'
+        assert service._thread.is_alive()
+        assert service.score({'id': 'next'}, timeout=5)['id'] == 'next'
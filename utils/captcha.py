@@ -1,51 +1,204 @@
 from multicolorcaptcha import CaptchaGenerator
 from PIL import UnidentifiedImageError
+from collections import OrderedDict, deque
+import io
 import os
+import tempfile
+import threading
+import time
+import uuid
 
-def generate_and_verify_captcha():
-    # 1. Initialize the Captcha Generator
-    # The generator will handle creating the image, equation, and answer
-    generator = CaptchaGenerator()
+
+class MathCaptchaRenderer:
+    """Renders math CAPTCHAs as (PNG bytes, answer) pairs with one reusable generator."""
+    def __init__(self, difficult_level=2):
+        self.difficult_level = difficult_level
+        self.generator = CaptchaGenerator()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            captcha = self.generator.gen_math_captcha_image(difficult_level=self.difficult_level)
+        output = io.BytesIO()
+        captcha.image.save(output, format='PNG')
+        return output.getvalue(), captcha.equation_result
+
+
+# Longest pause between render attempts after repeated failures
+MAX_REFILL_BACKOFF = 5.0
+
+
+class CaptchaPool:
+    """
+    Keeps a bounded pool of pre-rendered CAPTCHAs that a background thread
+    refills, so issuing one is a constant-time pop instead of a render on the
+    request path. Issued CAPTCHAs are verified by id, once, before they expire.
+    """
+    def __init__(self, pool_size=256, ttl=120.0, renderer=None, clock=time.monotonic):
+        """
+        Args:
+            pool_size (int): Number of rendered CAPTCHAs kept ready.
+            ttl (float): Seconds an issued CAPTCHA can be answered.
+            renderer (callable): Returns (png_bytes, answer). Defaults to a MathCaptchaRenderer.
+            clock (callable): Monotonic time source, replaceable for testing.
+        """
+        self.pool_size = pool_size
+        self.ttl = ttl
+        self.renderer = renderer if renderer is not None else MathCaptchaRenderer()
+        self.clock = clock
+        self._ready = deque()
+        self._issued = OrderedDict()  # captcha_id -> (answer, expires_at), oldest first
+        self._lock = threading.Lock()
+        self._needs_refill = threading.Condition(self._lock)
+        self._stopped = False
+        self._thread = None
+        self.rendered_on_request = 0
+
+    def start(self):
+        """Starts the background refill thread."""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._refill, name='captcha-refill', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the background refill thread."""
+        with self._lock:
+            self._stopped = True
+            self._needs_refill.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _refill(self):
+        backoff = 0.0
+        while True:
+            with self._lock:
+                if backoff:
+                    # stop() notifies the condition, so it never waits out the pause
+                    self._needs_refill.wait_for(lambda: self._stopped, timeout=backoff)
+                while not self._stopped and len(self._ready) >= self.pool_size:
+                    self._needs_refill.wait()
+                if self._stopped:
+                    return
+            # Render outside the lock so issuing never waits on it
+            try:
+                entry = self.renderer()
+            except Exception as e:
+                # The font files occasionally fail to load, among other things;
+                # keep the thread alive and retry with a growing pause
+                backoff = min(max(backoff * 2, 0.1), MAX_REFILL_BACKOFF)
+                print(f"Warning: could not render a CAPTCHA, retrying in {backoff:.1f}s: {e}")
+                continue
+            backoff = 0.0
+            with self._lock:
+                self._ready.append(entry)
+
+    def issue(self):
+        """
+        Hands out a CAPTCHA.
+
+        Returns:
+            tuple: (captcha_id, png_bytes). The answer stays on the server.
+        """
+        with self._lock:
+            entry = self._ready.popleft() if self._ready else None
+            self._needs_refill.notify()
+        if entry is None:
+            # The pool ran dry (or was never started); render this one inline
+            entry = self.renderer()
+            with self._lock:
+                self.rendered_on_request += 1
+
+        png_bytes, answer = entry
+        captcha_id = uuid.uuid4().hex
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            self._issued[captcha_id] = (answer, now + self.ttl)
+        return captcha_id, png_bytes
+
+    def verify(self, captcha_id, answer):
+        """
+        Checks an answer. Each CAPTCHA can be verified only once, and only
+        before it expires.
+
+        Returns:
+            bool: True if the answer is correct.
+        """
+        with self._lock:
+            entry = self._issued.pop(captcha_id, None)
+        if entry is None:
+            return False
+        expected, expires_at = entry
+        if self.clock() >= expires_at:
+            return False
+        return str(answer).strip() == str(expected)
+
+    def _expire(self, now):
+        # Entries share one ttl, so the oldest ones always expire first
+        while self._issued:
+            captcha_id, (_, expires_at) = next(iter(self._issued.items()))
+            if expires_at > now:
+                break
+            del self._issued[captcha_id]
+
+    def stats(self):
+        """Returns the pool counters as a plain dict."""
+        with self._lock:
+            return {
+                'ready': len(self._ready),
+                'pool_size': self.pool_size,
+                'outstanding': len(self._issued),
+                'rendered_on_request': self.rendered_on_request
+            }
+
+
+def generate_and_verify_captcha(pool=None):
+    # 1. Take a pre-rendered math captcha from the pool
+    # The pool's renderer handles creating the image, equation, and answer
+    pool = pool if pool is not None else CaptchaPool(pool_size=1)
+    image_filename = None
 
     try:
-        # 2. Generate a math captcha image
-        captcha = generator.gen_math_captcha_image(difficult_level=2)
-        
-        # 3. Extract the useful information
-        image = captcha.image
-        equation_str = captcha.equation_str # this is the equation
-        correct_answer = captcha.equation_result 
-
-        # 4. Save the generated image so you can see it
-        output_directory = "utils"
-
-        # 2. Create the directory if it doesn't already exist
-        if not os.path.exists(output_directory):
-            os.makedirs(output_directory)
-
-        # 3. Construct the full path to the image file
-        image_filename = os.path.join(output_directory, "captcha_generated.png")
-        
-        # 4. Save the image to the specified path
-        image.save(image_filename)
-        
+        # 2. Issue a captcha; only its id and image leave the server
+        captcha_id, png_bytes = pool.issue()
+
+        # 3. Save the generated image so you can see it
+        # A temporary file per captcha, so concurrent runs never overwrite
+        # each other and nothing is left behind
+        with tempfile.NamedTemporaryFile(prefix='captcha_', suffix='.png', delete=False) as f:
+            f.write(png_bytes)
+            image_filename = f.name
+
         print(f"CAPTCHA image has been saved as '{image_filename}'")
         print("Please open the image to see the math problem.")
-        
-        # 5. Prompt the user for the answer
+
+        # 4. Prompt the user for the answer
         user_answer = input(f"What is the answer to the problem in the image? :")
 
-        # 6. Verify the answer
-        if user_answer.strip() == correct_answer:
+        # 5. Verify the answer
+        if pool.verify(captcha_id, user_answer):
             print("\n Correct! You have proven you are human.")
         else:
-            print(f"\n Incorrect. The correct answer was: {correct_answer}")
+            print("\n Incorrect (or expired).")
 
     except UnidentifiedImageError:
         print("Error: Could not generate the CAPTCHA. This can sometimes happen")
         print("if the library's font files are not found. Please try running again.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+    finally:
+        # Also on Ctrl-C or EOF at the prompt
+        if image_filename is not None and os.path.exists(image_filename):
+            os.remove(image_filename)
 
 
 if __name__ == "__main__":